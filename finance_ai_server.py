@@ -1,15 +1,112 @@
+# Started first so the cold-start report (GET /sentiment/startup) covers imports
+from sentiment_metrics import StartupTimer
+startup_timer = StartupTimer()
+
 from flask import Flask, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-from sentiment_analyzer import SentimentAnalyzer
+from sentiment_analyzer import SentimentAnalyzer, SentimentCache, SCORING_PROFILES
+from sentiment_deferred import DeferredSentiment
+from sentiment_drift import SentimentDriftMonitor
+from sentiment_result import to_json
 import json
+import os
 from datetime import datetime, timedelta
 import random
 import requests
+import threading
+import time
+
+startup_timer.mark('imports')
+
+class SentimentJSONProvider(DefaultJSONProvider):
+    """Serializes compact sentiment results only when a response is built"""
+    @staticmethod
+    def default(o):
+        try:
+            return to_json(o)
+        except TypeError:
+            return DefaultJSONProvider.default(o)
 
 app = Flask(__name__)
+app.json = SentimentJSONProvider(app)
 CORS(app)
 
-analyzer = SentimentAnalyzer()
+# Optional transformer scoring: path to a local sequence-classification checkpoint
+SENTIMENT_MODEL_PATH = os.environ.get('SENTIMENT_MODEL_PATH')
+
+# Number of worker processes for sentiment scoring (0 scores in the server process)
+SENTIMENT_WORKERS = int(os.environ.get('SENTIMENT_WORKERS', '0'))
+
+# Record per-stage sentiment latency histograms (GET /sentiment/metrics)
+SENTIMENT_INSTRUMENT = os.environ.get('SENTIMENT_INSTRUMENT', '') == '1'
+
+# Hard cap on characters scored per message; longer messages are chunked
+# by sentence and only the first SENTIMENT_MAX_CHARS characters are scored
+SENTIMENT_MAX_CHARS = int(os.environ.get('SENTIMENT_MAX_CHARS', '20000'))
+
+# Warm the analyzer up (TextBlob and its lexicon, about 0.35 s, plus a sample
+# message through the backend and workers) before serving. With
+# SENTIMENT_WARM_UP=0 it runs in the background instead, so the server starts
+# faster and GET /ready reports 503 until it finishes
+SENTIMENT_WARM_UP = os.environ.get('SENTIMENT_WARM_UP', '1') == '1'
+
+# Most texts one /sentiment/batch request may score
+SENTIMENT_MAX_BATCH = int(os.environ.get('SENTIMENT_MAX_BATCH', '1000'))
+
+# Emotion keyword lexicon; edit it and POST /sentiment/lexicon/reload to apply
+SENTIMENT_LEXICON_PATH = os.environ.get(
+    'SENTIMENT_LEXICON_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'emotion_lexicon.json')
+)
+
+# Sentiment worker processes restarted by forkserver/spawn import this module
+# as __mp_main__; they must not start pools or warm up of their own
+IN_POOL_WORKER = __name__ == '__mp_main__'
+
+# Worker processes score with VADER; fail before loading a model they would ignore
+if SENTIMENT_MODEL_PATH and SENTIMENT_WORKERS:
+    raise ValueError("SENTIMENT_WORKERS scores with VADER only; unset it to use SENTIMENT_MODEL_PATH")
+
+sentiment_backend = None
+if SENTIMENT_MODEL_PATH:
+    from sentiment_backends import TransformerBackend
+    sentiment_backend = TransformerBackend(SENTIMENT_MODEL_PATH)
+
+# Per-user mood drift alerts for messages sent with a session_id
+drift_monitor = SentimentDriftMonitor()
+
+# Keep a bounded window of recent messages; summaries still cover all of them
+analyzer = SentimentAnalyzer(history_limit=1000, backend=sentiment_backend,
+                             process_workers=0 if IN_POOL_WORKER else SENTIMENT_WORKERS, instrument=SENTIMENT_INSTRUMENT,
+                             emotion_lexicon_path=SENTIMENT_LEXICON_PATH,
+                             max_scored_chars=SENTIMENT_MAX_CHARS, drift_monitor=drift_monitor)
+startup_timer.mark('analyzer')
+
+# Set when the warm-up fails; the server stays up but never reports ready
+warm_up_error = None
+
+def warm_up_analyzer():
+    global warm_up_error
+    try:
+        analyzer.warm_up()
+    except Exception as e:
+        warm_up_error = str(e)
+        print(f"Sentiment warm-up failed: {e}")
+        return
+    startup_timer.mark('warm_up')
+
+if IN_POOL_WORKER:
+    pass
+elif SENTIMENT_WARM_UP:
+    warm_up_analyzer()
+else:
+    threading.Thread(target=warm_up_analyzer, name='sentiment-warm-up', daemon=True).start()
+
+# Background scoring for /chat requests that don't need the empathetic prefix
+deferred_sentiment = DeferredSentiment(analyzer)
+
+# Longest a client may block waiting on a deferred result (seconds)
+MAX_RESULT_WAIT = 10.0
 
 # --- Mock Data ---
 # Using the same structure as the frontend for consistency
@@ -83,16 +180,52 @@ mock_recommendations = {
 
 # --- API Endpoints ---
 
+@app.route('/health', methods=['GET'])
+def health():
+    """Liveness: the process is up and serving requests"""
+    return jsonify({'status': 'ok', 'timestamp': datetime.now().isoformat()})
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    """Readiness: lexicons and models are loaded and the warm-up scoring has run"""
+    checks = {
+        'analyzer_warmed_up': analyzer.warmed_up,
+        'vader_lexicon_loaded': bool(analyzer.vader.lexicon),
+        'emotion_lexicon_loaded': bool(analyzer.emotion_matcher.categories),
+    }
+    if analyzer.pool is not None:
+        checks['worker_pool_started'] = bool(analyzer.pool.pids)
+    is_ready = all(checks.values())
+    body = {'status': 'ready' if is_ready else 'warming_up', 'checks': checks}
+    if warm_up_error is not None:
+        body['status'] = 'failed'
+        body['error'] = warm_up_error
+    return jsonify(body), 200 if is_ready else 503
+
 @app.route('/chat', methods=['POST'])
 def chat():
     data = request.get_json()
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
     message = data.get('message', '')
+    session_id = data.get('session_id')
+    profile = data.get('sentiment_profile', 'full')
 
     if not message:
         return jsonify({'error': 'No message provided'}), 400
-
-    sentiment_data = analyzer.analyze_sentiment(message)
-    prefix = analyzer.get_empathetic_response_prefix(sentiment_data)
+    if profile not in SCORING_PROFILES:
+        return jsonify({'error': f'Unknown sentiment_profile: {profile}'}), 400
+
+    # Sentiment is only on the critical path when the reply needs the
+    # empathetic prefix; otherwise it is scored in the background
+    deferred = not data.get('empathetic_prefix', True)
+    if deferred:
+        message_id = deferred_sentiment.submit(message, session_id=session_id, profile=profile)
+        prefix = ''
+    else:
+        sentiment_data = analyzer.analyze_sentiment(message, session_id=session_id, profile=profile,
+                                                    include_timings=bool(data.get('include_timings')))
+        prefix = analyzer.get_empathetic_response_prefix(sentiment_data)
 
     response_message = "This is a placeholder response."
 
@@ -103,11 +236,142 @@ def chat():
     elif 'budget' in message.lower():
         response_message = "Let's talk about your budget."
 
+    if deferred:
+        return jsonify({
+            'response': response_message,
+            'message_id': message_id,
+            'sentiment_status': 'pending'
+        })
     return jsonify({
         'response': prefix + response_message,
         'sentiment_data': sentiment_data
     })
 
+@app.route('/sentiment/result/<message_id>', methods=['GET'])
+def sentiment_result(message_id):
+    try:
+        wait = min(max(float(request.args.get('wait', 0)), 0.0), MAX_RESULT_WAIT)
+    except ValueError:
+        return jsonify({'error': 'wait must be a number of seconds'}), 400
+
+    found = deferred_sentiment.get(message_id, timeout=wait)
+    if found is None:
+        return jsonify({'error': 'Unknown message_id'}), 404
+    status, result = found
+    if status == 'pending':
+        return jsonify({'message_id': message_id, 'status': status}), 202
+    if status == 'error':
+        return jsonify({'message_id': message_id, 'status': status, 'error': result}), 500
+    return jsonify({'message_id': message_id, 'status': status, 'sentiment_data': result})
+
+@app.route('/sentiment/batch', methods=['POST'])
+def sentiment_batch():
+    data = request.get_json()
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+    texts = data.get('texts')
+
+    if not texts:
+        return jsonify({'error': 'No texts provided'}), 400
+    if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+        return jsonify({'error': 'texts must be a list of strings'}), 400
+    if len(texts) > SENTIMENT_MAX_BATCH:
+        return jsonify({'error': f'At most {SENTIMENT_MAX_BATCH} texts per batch'}), 400
+    profile = data.get('profile', 'full')
+    if profile not in SCORING_PROFILES:
+        return jsonify({'error': f'Unknown profile: {profile}'}), 400
+    record_history = data.get('record_history', True)
+    if not isinstance(record_history, bool):
+        return jsonify({'error': 'record_history must be true or false'}), 400
+    session_id = data.get('session_id')
+    if session_id is not None and not isinstance(session_id, str):
+        return jsonify({'error': 'session_id must be a string'}), 400
+
+    batch = analyzer.analyze_batch(texts, record_history=record_history,
+                                   session_id=session_id, profile=profile)
+    return jsonify(batch)
+
+@app.route('/sentiment/summary', methods=['GET'])
+def sentiment_summary():
+    window = request.args.get('window')
+    if window is not None and window not in analyzer.tracker.WINDOWS:
+        return jsonify({'error': f'Unknown window: {window}'}), 400
+
+    return jsonify(analyzer.get_sentiment_summary(window))
+
+@app.route('/sentiment/timeseries', methods=['GET'])
+def sentiment_timeseries():
+    resolution = request.args.get('resolution', 'minute')
+    if resolution not in analyzer.tracker.ROLLUPS:
+        return jsonify({'error': f"Unknown resolution: {resolution}"}), 400
+    try:
+        start = request.args.get('start')
+        end = request.args.get('end')
+        start = datetime.fromisoformat(start) if start else None
+        end = datetime.fromisoformat(end) if end else None
+    except ValueError:
+        return jsonify({'error': 'start and end must be ISO 8601 timestamps'}), 400
+    return jsonify(analyzer.get_sentiment_timeseries(resolution, start, end))
+
+@app.route('/sentiment/<session_id>/summary', methods=['GET'])
+def session_sentiment_summary(session_id):
+    window = request.args.get('window')
+    if window is not None and window not in analyzer.tracker.WINDOWS:
+        return jsonify({'error': f'Unknown window: {window}'}), 400
+
+    summary = analyzer.get_session_summary(session_id, window)
+    if summary is None:
+        return jsonify({'error': 'Session not found'}), 404
+    return jsonify(summary)
+
+@app.route('/sentiment/<session_id>/drift', methods=['GET'])
+def session_sentiment_drift(session_id):
+    state = drift_monitor.state(session_id)
+    if state is None:
+        return jsonify({'error': 'Unknown session'}), 404
+    return jsonify(state)
+
+@app.route('/sentiment/drift/events', methods=['GET'])
+def sentiment_drift_events():
+    """Take queued drift events, oldest first (each is returned once)"""
+    try:
+        limit = int(request.args.get('limit', 100))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    return jsonify({'events': drift_monitor.drain(max(limit, 0)), 'stats': drift_monitor.stats()})
+
+@app.route('/sentiment/metrics', methods=['GET'])
+def sentiment_stage_metrics():
+    metrics = analyzer.stage_metrics()
+    if metrics is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, 'stages': metrics})
+
+@app.route('/sentiment/cache', methods=['GET'])
+def sentiment_cache_stats():
+    stats = analyzer.cache_stats()
+    if stats is None:
+        return jsonify({'enabled': False})
+    return jsonify(dict(stats, enabled=True))
+
+@app.route('/sentiment/lexicon', methods=['GET'])
+def sentiment_lexicon_stats():
+    return jsonify(analyzer.lexicon_stats())
+
+@app.route('/sentiment/lexicon/reload', methods=['POST'])
+def reload_sentiment_lexicon():
+    try:
+        stats = analyzer.reload_emotion_lexicon()
+    except (OSError, ValueError) as e:
+        # The previous lexicon stays active
+        return jsonify({'error': f"Lexicon reload failed: {e}"}), 400
+    return jsonify(stats)
+
+@app.route('/sentiment/startup', methods=['GET'])
+def sentiment_startup():
+    """Cold-start timings: server startup phases and analyzer lexicon loading"""
+    return jsonify({**startup_timer.report(), 'analyzer': analyzer.startup})
+
 @app.route('/user/<user_id>', methods=['GET'])
 def get_user(user_id):
     user = mock_users.get(user_id)
@@ -124,6 +388,30 @@ def get_portfolio(user_id):
 
 NEWS_API_KEY = "YOUR_NEWS_API_KEY" # Replace with your News API key
 
+# Sentiment label per article URL, so each article is scored once
+news_sentiment_cache = SentimentCache(max_size=2048)
+
+def tag_news_sentiment(articles):
+    """
+    Get a sentiment label for each NewsAPI article.
+    Uncached articles are scored together in one batch from their title
+    and description; news scores are kept out of the chat history and the
+    chat result cache (articles are cached by URL here instead).
+    Returns: (labels, number of articles scored)
+    """
+    keys = [article.get('url') or f"{article.get('title')}|{article.get('publishedAt')}" for article in articles]
+    labels = [news_sentiment_cache.get(key) for key in keys]
+
+    missing = [i for i, label in enumerate(labels) if label is None]
+    if missing:
+        texts = [' '.join(filter(None, (articles[i].get('title'), articles[i].get('description'))))
+                 for i in missing]
+        batch = analyzer.analyze_batch(texts, record_history=False, profile='fast', use_cache=False)
+        for i, result in zip(missing, batch['results']):
+            labels[i] = result.sentiment
+            news_sentiment_cache.put(keys[i], labels[i])
+    return labels, len(missing)
+
 @app.route('/market-news', methods=['GET'])
 def get_market_news():
     if NEWS_API_KEY == "YOUR_NEWS_API_KEY":
@@ -131,11 +419,16 @@ def get_market_news():
     
     try:
         url = f"https://newsapi.org/v2/top-headlines?country=in&category=business&apiKey={NEWS_API_KEY}"
+        fetch_start = time.perf_counter()
         response = requests.get(url)
         data = response.json()
+        fetch_ms = (time.perf_counter() - fetch_start) * 1000
         
         if data['status'] == 'ok':
             articles = data['articles']
+            scoring_start = time.perf_counter()
+            sentiments, scored = tag_news_sentiment(articles)
+            scoring_ms = (time.perf_counter() - scoring_start) * 1000
             # Format the articles to match the frontend's data structure
             formatted_articles = [
                 {
@@ -144,13 +437,22 @@ def get_market_news():
                     "summary": article['description'],
                     "source": article['source']['name'],
                     "category": "business",
-                    "sentiment": "neutral",
+                    "sentiment": sentiment,
                     "timestamp": article['publishedAt'],
                     "image": article['urlToImage'],
                     "imageAlt": article['title']
-                } for i, article in enumerate(articles)
+                } for i, (article, sentiment) in enumerate(zip(articles, sentiments))
             ]
-            return jsonify(formatted_articles)
+            # Timings go in headers so the response body keeps its shape
+            news_response = jsonify(formatted_articles)
+            news_response.headers['X-News-Fetch-Ms'] = f"{fetch_ms:.1f}"
+            news_response.headers['X-Sentiment-Scoring-Ms'] = f"{scoring_ms:.1f}"
+            news_response.headers['X-Sentiment-Scored'] = str(scored)
+            news_response.headers['X-Sentiment-Cached'] = str(len(articles) - scored)
+            news_response.headers['Access-Control-Expose-Headers'] = (
+                'X-News-Fetch-Ms, X-Sentiment-Scoring-Ms, X-Sentiment-Scored, X-Sentiment-Cached'
+            )
+            return news_response
         else:
             return jsonify(mock_news) # Fallback to mock data
             
@@ -267,4 +569,7 @@ def rebalance_portfolio(user_id):
 
 
 if __name__ == '__main__':
+    report = startup_timer.report()
+    phases = ', '.join(f"{phase} {ms:.0f} ms" for phase, ms in report['phases_ms'].items())
+    print(f"Startup: {report['total_ms']:.0f} ms ({phases})")
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -2,97 +2,747 @@
 Sentiment Analysis Module for Finance Chatbot
 Detects user emotions and provides empathetic responses
 """
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-from textblob import TextBlob
 import json
+import re
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
+from sentiment_backends import VaderBackend
+from sentiment_metrics import StageMetrics
+from sentiment_history import SentimentHistoryLog, SentimentTracker, SessionSentimentStore, ThreadBufferedHistory
+from sentiment_result import HistoryEntry, SentimentResult, emotion_mask, mask_emotions
+from sentiment_snapshot import DEFAULT_SNAPSHOT_PATH, load_vader
+
+# TextBlob pulls in NLTK (about 300 ms), so it is imported on first use
+_textblob = None
+
+
+def _load_textblob():
+    """Get TextBlob's pattern sentiment scorer plus its tokenizer's abbreviation rules"""
+    global _textblob
+    if _textblob is None:
+        from textblob.en import sentiment
+        from textblob._text import ABBREVIATIONS, RE_ABBR3
+        _textblob = (sentiment, ABBREVIATIONS, RE_ABBR3)
+    return _textblob
+
+
+# Built-in emotion keyword lexicon, in the order detected emotions are
+# reported. emotion_lexicon.json holds the same lists for deployments that
+# load (and hot reload) the lexicon from a file.
+EMOTION_LEXICON = {
+    # Stress/Anxiety indicators
+    'stressed': ['worried', 'stress', 'anxious', 'concern', 'scared', 'panic', 'overwhelm'],
+    # Frustration indicators
+    'frustrated': ['frustrated', 'annoyed', 'angry', 'upset', 'hate', 'can\'t'],
+    # Confusion indicators
+    'confused': ['confused', 'don\'t understand', 'unclear', 'lost', 'help'],
+    # Hope/Optimism indicators
+    'hopeful': ['hope', 'better', 'improve', 'excited', 'looking forward', 'can do'],
+    # Gratitude indicators
+    'grateful': ['thank', 'appreciate', 'grateful', 'thanks']
+}
+
+
+def _trie_pattern(words):
+    """Build a regex alternation that shares common prefixes between words"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+    
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # A word ending here makes the rest optional; greedy matching still
+        # prefers the longest keyword
+        return '(?:' + body + ')?' if '' in node else body
+    
+    return build(trie)
+
+
+def load_emotion_lexicon(path):
+    """
+    Read an emotion lexicon from a JSON file mapping each emotion to a list
+    of keywords. Raises ValueError when the file is not shaped that way.
+    """
+    with open(path, 'r') as f:
+        lexicon = json.load(f)
+    
+    if not isinstance(lexicon, dict) or not lexicon:
+        raise ValueError(f"{path}: expected a non-empty object of emotion -> keywords")
+    for category, words in lexicon.items():
+        if not isinstance(words, list) or not all(isinstance(word, str) and word for word in words):
+            raise ValueError(f"{path}: keywords for '{category}' must be a list of non-empty strings")
+    return lexicon
+
+
+class EmotionMatcher:
+    """
+    Finds every emotion category in a lowercased text with a single regex pass.
+    Matches can be returned as a bitmask over categories (bit i is
+    categories[i]) or as a list of names.
+    mode='word' only matches keywords starting at a word boundary ('hate' no
+    longer fires inside 'whatever'); mode='substring' keeps the original
+    plain substring semantics.
+    """
+    MODES = ('word', 'substring')
+    
+    def __init__(self, lexicon=EMOTION_LEXICON, mode='word'):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown emotion match mode: {mode}")
+        
+        compile_start = time.perf_counter()
+        self.mode = mode
+        self.categories = tuple(lexicon)
+        
+        keyword_categories = {}
+        for category, words in lexicon.items():
+            for word in words:
+                keyword_categories.setdefault(word.lower(), set()).add(category)
+        
+        # Only the longest keyword starting at a position is captured, so it
+        # also carries the categories of every keyword that is its prefix
+        self._keyword_masks = {}
+        for word, categories in keyword_categories.items():
+            merged = set(categories)
+            for other, other_categories in keyword_categories.items():
+                if other != word and word.startswith(other):
+                    merged |= other_categories
+            self._keyword_masks[word] = emotion_mask(merged, self.categories)
+        self._all_mask = (1 << len(self.categories)) - 1
+        
+        boundary = r'\b' if mode == 'word' else ''
+        # Zero-width lookahead so overlapping keywords are all seen
+        self._pattern = re.compile(f"(?={boundary}({_trie_pattern(keyword_categories)}))")
+        self.compile_ms = (time.perf_counter() - compile_start) * 1000
+    
+    def stats(self):
+        """Get lexicon size, compiled pattern size and compile time"""
+        return {
+            'mode': self.mode,
+            'categories': len(self.categories),
+            'keywords': len(self._keyword_masks),
+            'pattern_chars': len(self._pattern.pattern),
+            'compile_ms': self.compile_ms
+        }
+    
+    def match_mask(self, text):
+        """Return the emotion categories found in text as a bitmask"""
+        mask = 0
+        for match in self._pattern.finditer(text):
+            mask |= self._keyword_masks[match.group(1)]
+            if mask == self._all_mask:
+                break
+        return mask
+    
+    def match(self, text):
+        """Return the emotion categories found in text, in lexicon order"""
+        return mask_emotions(self.match_mask(text), self.categories)
+
+
+def _pattern_tokens(words):
+    """
+    Derive TextBlob's (pattern) tokens from whitespace-split words without
+    running its tokenizer. Only plain words, optionally followed by one of
+    , ! ? or a sentence period, are handled; anything that pattern's
+    tokenizer could treat differently (contractions, quotes, emoticons,
+    abbreviations, single letters) returns None so the caller falls back
+    to the real tokenizer.
+    """
+    _, abbreviations, abbreviation_pattern = _load_textblob()
+    tokens = []
+    for word in words:
+        if word.isalpha():
+            if len(word) == 1 and word not in ('a', 'A', 'i', 'I'):
+                return None
+            tokens.append(word.lower())
+            continue
+        
+        stem, mark = word[:-1], word[-1]
+        if len(stem) < 2 or not stem.isalpha() or mark not in ',!?.':
+            return None
+        if mark == '.' and (word in abbreviations or abbreviation_pattern.match(word)):
+            # Abbreviations like "Mr." keep their period
+            tokens.append(word.lower())
+        else:
+            tokens.append(stem.lower())
+            tokens.append(mark)
+    return tokens
+
+
+class MessageTokens:
+    """
+    A message normalized and tokenized once, shared by every scorer.
+    text is whitespace-normalized, so it is exactly the space-joined token
+    stream; lower is used for emotion matching, words feed VADER, and
+    TextBlob's tokens are derived from words when possible.
+    """
+    __slots__ = ('text', 'words', 'lower', 'is_ascii')
+    
+    def __init__(self, text):
+        self.words = text.split()
+        self.text = ' '.join(self.words)
+        self.lower = self.text.lower()
+        self.is_ascii = self.text.isascii()
+    
+    def pattern_tokens(self):
+        """TextBlob tokens for the message, or None when its tokenizer is needed"""
+        return _pattern_tokens(self.words) if self.is_ascii else None
+
+
+def _tokenize(text):
+    return text if isinstance(text, MessageTokens) else MessageTokens(text)
+
+
+# Scoring profiles: 'full' runs every scorer, 'fast' skips TextBlob and
+# leaves out polarity/subjectivity
+SCORING_PROFILES = ('full', 'fast')
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+
+def split_chunks(text, max_chars):
+    """
+    Split whitespace-normalized text into chunks of whole sentences, each at
+    most max_chars long. Sentences longer than that are split between words.
+    """
+    chunks = []
+    current = ''
+    for sentence in _SENTENCE_END.split(text):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(' ', 0, max_chars + 1)
+            if cut <= 0:
+                cut = max_chars
+            if current:
+                chunks.append(current)
+                current = ''
+            chunks.append(sentence[:cut])
+            sentence = sentence[cut:].lstrip()
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            chunks.append(current)
+            current = sentence
+        elif sentence:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _cap_text(text, max_chars):
+    """Cut text to at most max_chars, at a word boundary when there is one"""
+    if max_chars is None or len(text) <= max_chars:
+        return text
+    capped = text[:max_chars]
+    if not text[max_chars].isspace():
+        head = capped.rsplit(None, 1)
+        if len(head) > 1:
+            capped = head[0]
+    return capped
+
+
+class SentimentCache:
+    """Bounded LRU cache of scored messages with an optional TTL (seconds)"""
+    def __init__(self, max_size=1024, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            value, stored_at = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self.evictions += 1
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, key, value):
+        """Store value under key, evicting least recently used entries"""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        """Drop all entries (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self):
+        """Get cache size and hit/miss/eviction counters"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
 
 class SentimentAnalyzer:
-    def __init__(self):
-        self.vader = SentimentIntensityAnalyzer()
-        self.sentiment_history = []
+    def __init__(self, cache_size=1024, cache_ttl=None, emotion_match='word',
+                 history_limit=None, history_spill_path=None, history_log_dir=None,
+                 columnar_history=False, backend=None, process_workers=0,
+                 instrument=False, emotion_lexicon_path=None, long_text_chars=1000,
+                 long_text_chunk_chars=500, max_scored_chars=20000,
+                 vader_snapshot_path=DEFAULT_SNAPSHOT_PATH, drift_monitor=None):
+        """
+        cache_size: max scored messages kept in the result cache (0 disables it)
+        cache_ttl: seconds a cached score stays valid (None keeps it until evicted)
+        emotion_match: 'word' or 'substring' (legacy keyword matching)
+        history_limit: max history entries kept in memory (None is unbounded)
+        history_spill_path: JSON-lines file that receives entries evicted from history
+        history_log_dir: directory for an append-only log of every history entry
+        columnar_history: also keep every message in a NumPy-backed columnar store
+        backend: SentimentBackend that produces compound/pos/neg/neu scores
+                 (defaults to VADER)
+        process_workers: score in this many worker processes (0 scores in-process);
+                         workers run VADER, so this needs the default backend
+        instrument: record per-stage latency histograms for analyze_sentiment
+        emotion_lexicon_path: JSON emotion lexicon to load instead of EMOTION_LEXICON;
+                              reload_emotion_lexicon() picks up later edits
+        long_text_chars: messages longer than this are scored sentence chunk by
+                         sentence chunk and aggregated (None disables chunking)
+        long_text_chunk_chars: target size of those chunks
+        max_scored_chars: hard cap on characters scored per message; anything
+                          beyond it is ignored (None scores everything)
+        vader_snapshot_path: precompiled VADER lexicon snapshot (None parses
+                             vaderSentiment's text files)
+        drift_monitor: SentimentDriftMonitor fed every message that has a session_id
+        """
+        if process_workers and backend is not None and not isinstance(backend, VaderBackend):
+            raise ValueError(f"process_workers only supports VADER scoring, not the "
+                             f"{getattr(backend, 'name', type(backend).__name__)} backend")
+        vader_start = time.perf_counter()
+        self.vader, snapshot_used = load_vader(vader_snapshot_path)
+        self.startup = {
+            'vader_ms': (time.perf_counter() - vader_start) * 1000,
+            'vader_snapshot': snapshot_used
+        }
+        self.warmed_up = False
+        self.backend = backend if backend is not None else VaderBackend(self.vader)
+        # Backends that can reuse the shared token stream expose score_tokens
+        self._score_tokens = getattr(self.backend, 'score_tokens', None)
+        self.metrics = StageMetrics() if instrument else None
+        self.cache = SentimentCache(cache_size, cache_ttl) if cache_size else None
+        self.emotion_lexicon_path = emotion_lexicon_path
+        self.lexicon_reloads = 0
+        self.lexicon_loaded_at = datetime.now().isoformat()
+        lexicon = load_emotion_lexicon(emotion_lexicon_path) if emotion_lexicon_path else EMOTION_LEXICON
+        self.emotion_matcher = EmotionMatcher(lexicon, mode=emotion_match)
+        self.pool = None
+        if process_workers:
+            from sentiment_pool import SentimentWorkerPool
+            self.pool = SentimentWorkerPool(process_workers, analyzer_kwargs={
+                'emotion_match': emotion_match,
+                'emotion_lexicon_path': emotion_lexicon_path
+            })
+        self.history_log = SentimentHistoryLog(history_log_dir) if history_log_dir else None
+        self.tracker = SentimentTracker(history_limit, history_spill_path)
+        # Filled as buffered history is merged; read it through the
+        # get_columnar_* methods, which merge first
+        self.columns = None
+        if columnar_history:
+            # Imported here so NumPy is only needed when the store is used
+            from sentiment_columns import ColumnarSentimentStore
+            self.columns = ColumnarSentimentStore()
+        # Request threads record into per-thread buffers, merged on read
+        self.history = ThreadBufferedHistory(self.tracker, log=self.history_log,
+                                             on_merge=self._append_columns if self.columns is not None else None)
+        # Per-session state; the lexicons and scorers above are shared
+        self.sessions = SessionSentimentStore()
+        self.drift_monitor = drift_monitor
+        self.long_text_chars = long_text_chars
+        self.long_text_chunk_chars = long_text_chunk_chars
+        self.max_scored_chars = max_scored_chars
+    
+    @property
+    def sentiment_history(self):
+        """Snapshot of recent history entries, oldest first"""
+        with self.history.reading() as tracker:
+            return list(tracker.entries)
+    
+    def _append_columns(self, entries):
+        for entry in entries:
+            self.columns.append(entry.text, entry.sentiment, entry.compound, entry.emotions, entry.timestamp)
         
-    def analyze_sentiment(self, text):
+    def analyze_sentiment(self, text, session_id=None, profile='full', include_timings=False):
         """
         Analyze sentiment using VADER (better for social media/chat text)
-        Returns: dict with sentiment scores and classification
+        Every message is recorded in the global history (summaries, rollups,
+        log and columnar store); with session_id it is also recorded in the
+        session's own tracker.
+        profile: 'full' or 'fast' (skips TextBlob polarity/subjectivity)
+        include_timings: add per-stage durations to the result as 'timings_ms'
+        Returns: SentimentResult (readable like the old result dict; to_dict()
+        gives the JSON form)
         """
-        # VADER analysis
-        vader_scores = self.vader.polarity_scores(text)
+        # Stage timing only runs when instrumented or asked for
+        timings = {} if include_timings or self.metrics is not None else None
+        start = time.perf_counter_ns() if timings is not None else 0
         
-        # TextBlob for additional context
-        blob = TextBlob(text)
-        textblob_polarity = blob.sentiment.polarity
-        textblob_subjectivity = blob.sentiment.subjectivity
+        result = self._score(text, profile, timings)
+        result.timestamp = time.time()
         
-        # Classify sentiment
-        compound = vader_scores['compound']
+        # Track sentiment history
+        history_start = time.perf_counter_ns() if timings is not None else 0
+        entry = self._history_entry(text, result)
+        self.history.record(entry)
+        if session_id is not None:
+            self.sessions.record(session_id, entry)
+            if self.drift_monitor is not None:
+                self.drift_monitor.observe(session_id, entry)
+        
+        if timings is not None:
+            end = time.perf_counter_ns()
+            timings['history'] = end - history_start
+            timings['total'] = end - start
+            if self.metrics is not None:
+                self.metrics.record(timings)
+            if include_timings:
+                result.timings_ms = {stage: ns / 1e6 for stage, ns in timings.items()}
+        
+        return result
+    
+    def analyze_batch(self, texts, record_history=True, session_id=None, profile='full', use_cache=True):
+        """
+        Analyze a list of messages in one call.
+        Results come back in input order and share a single timestamp;
+        cache misses are scored by the backend as one batch and history is
+        extended once for the whole batch.
+        use_cache=False neither reads nor fills the result cache, for texts
+        (like news) that should not evict chat messages from it.
+        Returns: dict with per-message results and throughput stats
+        """
+        start = time.perf_counter()
+        results = self._score_many(texts, profile, use_cache)
+        # Stamped once scored, like analyze_sentiment, so history stays
+        # close to time order while other requests record
+        timestamp = time.time()
+        for result in results:
+            result.timestamp = timestamp
+        
+        if record_history:
+            history_entry = self._history_entry
+            entries = [history_entry(text, result) for text, result in zip(texts, results)]
+            self.history.extend(entries)
+            if session_id is not None:
+                self.sessions.extend(session_id, entries)
+                if self.drift_monitor is not None:
+                    for entry in entries:
+                        self.drift_monitor.observe(session_id, entry)
+        
+        elapsed = time.perf_counter() - start
+        return {
+            'results': results,
+            'count': len(results),
+            'elapsed_seconds': elapsed,
+            'messages_per_second': len(results) / elapsed if elapsed > 0 else 0.0
+        }
+    
+    def _score(self, text, profile='full', timings=None):
+        """
+        Score a single message without touching history.
+        Whitespace is normalized first and the result cache (if enabled) is
+        keyed on the normalized text; callers get their own copy of the result.
+        A cached full result also serves fast requests.
+        Long messages are capped and scored in chunks (see _compute_long).
+        Stage durations (ns) are added to timings when a dict is passed.
+        """
+        if profile not in SCORING_PROFILES:
+            raise ValueError(f"Unknown scoring profile: {profile}")
+        
+        tokens = MessageTokens(_cap_text(text, self.max_scored_chars))
+        if self._is_long(tokens):
+            compute = self._compute_long
+        else:
+            compute = self._compute_scores if self.pool is None else self._compute_pooled
+        if self.cache is None:
+            return self._mark_truncated(compute(tokens, profile, timings=timings), text)
+        
+        # Read before scoring, see reload_emotion_lexicon
+        key = (self.lexicon_reloads, tokens.text)
+        if timings is None:
+            scores = self._cached_scores(key, profile)
+        else:
+            lookup_start = time.perf_counter_ns()
+            scores = self._cached_scores(key, profile)
+            timings['cache'] = time.perf_counter_ns() - lookup_start
+        if scores is None:
+            scores = compute(tokens, profile, timings=timings)
+            self.cache.put(key, scores)
+        return self._mark_truncated(self._copy_scores(scores, profile), text)
+    
+    def _score_many(self, texts, profile='full', use_cache=True):
+        """Score several messages, sending all cache misses to the backend at once"""
+        if profile not in SCORING_PROFILES:
+            raise ValueError(f"Unknown scoring profile: {profile}")
+        
+        messages = [MessageTokens(_cap_text(text, self.max_scored_chars)) for text in texts]
+        generation = self.lexicon_reloads
+        cache = self.cache if use_cache else None
+        if cache is None:
+            scores = [None] * len(messages)
+        else:
+            scores = [self._cached_scores((generation, message.text), profile) for message in messages]
+        
+        missing = [i for i, cached in enumerate(scores) if cached is None]
+        if missing:
+            for i in missing:
+                if self._is_long(messages[i]):
+                    scores[i] = self._compute_long(messages[i], profile)
+            missing_short = [i for i in missing if scores[i] is None]
+            if not missing_short:
+                computed = []
+            elif self.pool is None:
+                computed = self._compute_local([messages[i] for i in missing_short], profile)
+            else:
+                computed = self.pool.score_many([messages[i].text for i in missing_short], profile,
+                                                fallback=self._compute_local)
+            for i, computed_scores in zip(missing_short, computed):
+                scores[i] = computed_scores
+            if cache is not None:
+                for i in missing:
+                    cache.put((generation, messages[i].text), scores[i])
+        
+        if cache is not None:
+            scores = [self._copy_scores(cached, profile) for cached in scores]
+        return [self._mark_truncated(result, text) for result, text in zip(scores, texts)]
+    
+    def _compute_local(self, texts, profile):
+        """Score texts (or MessageTokens) in this process, batching the backend call"""
+        messages = [_tokenize(text) for text in texts]
+        if self._score_tokens is not None:
+            backend_scores = [self._score_tokens(message) for message in messages]
+        else:
+            backend_scores = self.backend.score_batch([message.text for message in messages])
+        return [self._compute_scores(message, profile, polarity_scores)
+                for message, polarity_scores in zip(messages, backend_scores)]
+    
+    def _compute_pooled(self, tokens, profile, timings=None):
+        """Score one message on the worker pool"""
+        start = time.perf_counter_ns() if timings is not None else 0
+        scores = self.pool.score_many([tokens.text], profile, fallback=self._compute_local)[0]
+        if timings is not None:
+            timings['pool'] = time.perf_counter_ns() - start
+        return scores
+    
+    def _is_long(self, tokens):
+        return self.long_text_chars is not None and len(tokens.text) > self.long_text_chars
+    
+    def _mark_truncated(self, result, text):
+        """Note in long_text when the message was cut at max_scored_chars"""
+        if self.max_scored_chars is not None and len(text) > self.max_scored_chars:
+            result.long_text = dict(result.long_text or {}, truncated=True, original_chars=len(text))
+        return result
+    
+    def _compute_long(self, tokens, profile, timings=None):
+        """
+        Score a long message in sentence chunks and aggregate them.
+        Each chunk costs about the same, so work grows linearly with length
+        (and is bounded by max_scored_chars). Chunks go to the worker pool
+        when there is one. Scores are averaged weighted by chunk length;
+        emotions are matched once over the whole message.
+        """
+        start = time.perf_counter_ns() if timings is not None else 0
+        chunks = split_chunks(tokens.text, self.long_text_chunk_chars)
+        if self.pool is None:
+            chunk_scores = self._compute_local(chunks, profile)
+        else:
+            chunk_scores = self.pool.score_many(chunks, profile, fallback=self._compute_local)
+        
+        weights = [len(chunk) for chunk in chunks]
+        total = sum(weights)
+        
+        def average(field):
+            return sum(getattr(scores, field) * weight for scores, weight in zip(chunk_scores, weights)) / total
+        
+        compound = round(average('compound'), 4)
         if compound >= 0.05:
             sentiment = 'positive'
-            emoji = '😊'
         elif compound <= -0.05:
             sentiment = 'negative'
-            emoji = '😟'
         else:
             sentiment = 'neutral'
-            emoji = '😐'
-        
-        # Detect specific emotions based on keywords
-        emotions = self._detect_emotions(text.lower())
-        
-        result = {
-            'sentiment': sentiment,
-            'emoji': emoji,
-            'compound': compound,
-            'positive': vader_scores['pos'],
-            'negative': vader_scores['neg'],
-            'neutral': vader_scores['neu'],
-            'polarity': textblob_polarity,
-            'subjectivity': textblob_subjectivity,
-            'emotions': emotions,
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        # Track sentiment history
-        self.sentiment_history.append({
-            'text': text[:50] + '...' if len(text) > 50 else text,
-            'sentiment': sentiment,
-            'compound': compound,
-            'timestamp': result['timestamp']
-        })
-        
+        matcher = self.emotion_matcher
+        result = SentimentResult(sentiment, compound, round(average('positive'), 3),
+                                 round(average('negative'), 3), round(average('neutral'), 3),
+                                 matcher.match_mask(tokens.lower), matcher.categories,
+                                 long_text={'chunks': len(chunks), 'scored_chars': len(tokens.text),
+                                            'truncated': False})
+        if profile == 'full':
+            result.polarity = average('polarity')
+            result.subjectivity = average('subjectivity')
+        if timings is not None:
+            timings['long_text'] = time.perf_counter_ns() - start
         return result
     
-    def _detect_emotions(self, text):
-        """Detect specific emotions from text"""
-        emotions = []
+    def _cached_scores(self, key, profile):
+        """Get cached scores that cover the profile, or None"""
+        scores = self.cache.get(key)
+        if scores is None or (profile == 'full' and scores.polarity is None):
+            return None
+        return scores
+    
+    @staticmethod
+    def _copy_scores(scores, profile):
+        return scores.copy(full=profile == 'full')
+    
+    def cache_stats(self):
+        """Get result cache counters, or None when caching is disabled"""
+        return self.cache.stats() if self.cache is not None else None
+    
+    def stage_metrics(self):
+        """Get per-stage latency histograms, or None when not instrumented"""
+        return self.metrics.snapshot() if self.metrics is not None else None
+    
+    def warm_up(self):
+        """
+        Load everything scoring needs up front (TextBlob and its lexicon are
+        otherwise loaded by the first full-profile message) and score a
+        sample message through the backend and, if there is one, the worker
+        pool. Call it before serving traffic, or before forking workers so
+        they inherit it. Errors are raised and leave warmed_up False.
+        Returns: startup timings
+        """
+        start = time.perf_counter()
+        sample = "Thanks, I'm worried about my budget."
+        self._compute_scores(MessageTokens(sample), 'full')
+        if self.pool is not None:
+            self.pool.score_many([sample], 'full')
+        self.startup['warm_up_ms'] = (time.perf_counter() - start) * 1000
+        self.warmed_up = True
+        return self.startup
+    
+    def reload_emotion_lexicon(self, path=None):
+        """
+        Recompile the emotion matcher from a lexicon file and swap it in.
+        The new matcher is fully built before the single attribute swap, so
+        concurrent requests see either the old or the new lexicon, never a
+        mix; if the file is missing or invalid the old matcher stays and the
+        error is raised. Worker processes are restarted and cached scores
+        dropped so every path uses the new lexicon.
+        Cache keys carry lexicon_reloads, read before scoring. Workers are
+        replaced before the swap and the counter is bumped after it, so a
+        request that read the new count scores with the new lexicon, and
+        one still scoring with the old lexicon caches under the old count,
+        which is never looked up again.
+        path: lexicon file (defaults to the one given at construction)
+        Returns: lexicon_stats() for the new matcher
+        """
+        path = path or self.emotion_lexicon_path
+        if not path:
+            raise ValueError("No emotion lexicon file configured")
         
-        # Stress/Anxiety indicators
-        stress_words = ['worried', 'stress', 'anxious', 'concern', 'scared', 'panic', 'overwhelm']
-        if any(word in text for word in stress_words):
-            emotions.append('stressed')
+        matcher = EmotionMatcher(load_emotion_lexicon(path), mode=self.emotion_matcher.mode)
+        if self.pool is not None:
+            self.pool.restart(dict(self.pool.analyzer_kwargs, emotion_lexicon_path=path))
+        self.emotion_matcher = matcher
+        self.lexicon_reloads += 1
+        self.emotion_lexicon_path = path
+        self.lexicon_loaded_at = datetime.now().isoformat()
+        if self.cache is not None:
+            # Only frees memory; the old entries are unreachable already
+            self.cache.clear()
+        return self.lexicon_stats()
+    
+    def lexicon_stats(self):
+        """Get the active emotion lexicon's source, size and compile time"""
+        return dict(self.emotion_matcher.stats(),
+                    source=self.emotion_lexicon_path or 'built-in',
+                    loaded_at=self.lexicon_loaded_at,
+                    reloads=self.lexicon_reloads)
+    
+    def _compute_scores(self, text, profile='full', vader_scores=None, timings=None):
+        """
+        Run the backend (VADER by default), emotion detection and, for the
+        full profile, TextBlob on a message (a string or MessageTokens).
+        Every stage works off the same tokenization pass. Precomputed backend
+        scores can be passed in as vader_scores.
+        """
+        if timings is not None:
+            clock = time.perf_counter_ns
+            mark = clock()
+        tokens = _tokenize(text)
         
-        # Frustration indicators
-        frustration_words = ['frustrated', 'annoyed', 'angry', 'upset', 'hate', 'can\'t']
-        if any(word in text for word in frustration_words):
-            emotions.append('frustrated')
+        # VADER analysis
+        if vader_scores is None:
+            if self._score_tokens is not None:
+                vader_scores = self._score_tokens(tokens)
+            else:
+                vader_scores = self.backend.score(tokens.text)
+        if timings is not None:
+            now = clock()
+            timings['vader'] = now - mark
+            mark = now
+        
+        # Classify sentiment (the emoji is derived from it)
+        compound = vader_scores['compound']
+        if compound >= 0.05:
+            sentiment = 'positive'
+        elif compound <= -0.05:
+            sentiment = 'negative'
+        else:
+            sentiment = 'neutral'
         
-        # Confusion indicators
-        confusion_words = ['confused', 'don\'t understand', 'unclear', 'lost', 'help']
-        if any(word in text for word in confusion_words):
-            emotions.append('confused')
+        # Detect specific emotions based on keywords; the matcher is read
+        # once so a concurrent lexicon reload can't mix bits and names
+        matcher = self.emotion_matcher
+        emotions = matcher.match_mask(tokens.lower)
+        if timings is not None:
+            now = clock()
+            timings['emotions'] = now - mark
+            mark = now
         
-        # Hope/Optimism indicators
-        hope_words = ['hope', 'better', 'improve', 'excited', 'looking forward', 'can do']
-        if any(word in text for word in hope_words):
-            emotions.append('hopeful')
+        result = SentimentResult(sentiment, compound, vader_scores['pos'], vader_scores['neg'],
+                                 vader_scores['neu'], emotions, matcher.categories)
         
-        # Gratitude indicators
-        gratitude_words = ['thank', 'appreciate', 'grateful', 'thanks']
-        if any(word in text for word in gratitude_words):
-            emotions.append('grateful')
+        # TextBlob for additional context, called through its pattern scorer
+        # so no TextBlob/namedtuple objects are built per message
+        if profile == 'full':
+            pattern_tokens = tokens.pattern_tokens()
+            pattern_sentiment = _load_textblob()[0]
+            result.polarity, result.subjectivity = pattern_sentiment(
+                tokens.text if pattern_tokens is None else pattern_tokens
+            )
+            if timings is not None:
+                timings['textblob'] = clock() - mark
         
-        return emotions
+        return result
+    
+    def _history_entry(self, text, result):
+        """Build the history record kept for an analyzed message"""
+        return HistoryEntry(text[:50] + '...' if len(text) > 50 else text, result.sentiment,
+                            result.compound, result.emotion_mask, result.emotion_names, result.timestamp)
+    
+    def _detect_emotions(self, text):
+        """Detect specific emotions from text"""
+        return self.emotion_matcher.match(text)
     
     def get_empathetic_response_prefix(self, sentiment_data):
         """Generate an empathetic response prefix based on sentiment"""
@@ -123,39 +773,97 @@ class SentimentAnalyzer:
         else:
             return ""
     
-    def get_sentiment_summary(self):
-        """Get summary of sentiment history"""
-        if not self.sentiment_history:
+    def get_sentiment_summary(self, window=None):
+        """
+        Get summary of sentiment history
+        window: None for all-time totals, 'messages' for the last N messages
+        or 'minutes' for the last T minutes
+        """
+        with self.history.reading() as tracker:
+            summary = tracker.summary(window)
+        if summary is None:
             return "No conversation history yet."
         
-        sentiments = [s['sentiment'] for s in self.sentiment_history]
-        avg_compound = sum(s['compound'] for s in self.sentiment_history) / len(self.sentiment_history)
-        
-        positive_count = sentiments.count('positive')
-        negative_count = sentiments.count('negative')
-        neutral_count = sentiments.count('neutral')
-        
+        return summary
+    
+    def get_sentiment_timeseries(self, resolution='minute', start=None, end=None):
+        """
+        Get per-minute or per-hour sentiment trend buckets.
+        start/end: optional datetimes bounding the range
+        Returns: dict with the resolution, bucket width and non-empty buckets
+        """
+        with self.history.reading() as tracker:
+            buckets = tracker.timeseries(resolution,
+                                         start.timestamp() if start is not None else None,
+                                         end.timestamp() if end is not None else None)
         return {
-            'total_messages': len(self.sentiment_history),
-            'positive': positive_count,
-            'negative': negative_count,
-            'neutral': neutral_count,
-            'average_sentiment': avg_compound,
-            'overall_mood': 'positive' if avg_compound > 0.1 else 'negative' if avg_compound < -0.1 else 'neutral'
+            'resolution': resolution,
+            'bucket_seconds': self.tracker.ROLLUPS[resolution][0],
+            'buckets': buckets
         }
     
+    def _columns_reading(self):
+        if self.columns is None:
+            raise ValueError("Columnar history is off; create the analyzer with columnar_history=True")
+        return self.history.reading()
+    
+    def get_columnar_summary(self, start=None, end=None):
+        """
+        Summarize the columnar store over a time range (datetimes, ISO
+        strings or epoch seconds; either may be None). Buffered entries are
+        merged first, so messages recorded by other threads are included.
+        Returns: ColumnarSentimentStore.aggregate() for the range
+        """
+        with self._columns_reading():
+            return self.columns.aggregate(start, end)
+    
+    def get_columnar_texts(self, start=None, end=None):
+        """Get the texts of messages in a time range from the columnar store"""
+        with self._columns_reading():
+            return list(self.columns.texts_between(start, end))
+    
+    def save_columnar_history(self, directory):
+        """Write the columnar store (with buffered entries merged) to a directory"""
+        with self._columns_reading():
+            self.columns.save(directory)
+    
+    def get_session_summary(self, session_id, window=None):
+        """Get summary of one session's sentiment history (None if unknown)"""
+        if session_id not in self.sessions:
+            return None
+        
+        summary = self.sessions.summary(session_id, window)
+        if summary is None:
+            return "No conversation history yet."
+        
+        return summary
+    
     def save_sentiment_history(self, filename='sentiment_history.json'):
         """Save sentiment history to file"""
+        with self.history.reading() as tracker:
+            tracker.flush()
+            entries = [entry.to_dict() for entry in tracker.entries]
         with open(filename, 'w') as f:
-            json.dump(self.sentiment_history, f, indent=2)
+            json.dump(entries, f, indent=2)
     
     def load_sentiment_history(self, filename='sentiment_history.json'):
         """Load sentiment history from file"""
         try:
             with open(filename, 'r') as f:
-                self.sentiment_history = json.load(f)
+                self.history.replace(json.load(f))
         except FileNotFoundError:
-            self.sentiment_history = []
+            self.history.replace([])
+    
+    def load_history_log(self, start=None, end=None):
+        """
+        Rebuild history from the append-only log, optionally limited to a
+        time range. Entries are streamed, so only the in-memory history
+        window is ever held at once.
+        """
+        if self.history_log is None:
+            raise ValueError("No history log configured")
+        self.history_log.flush()
+        self.history.replace(entry for entry, _ in self.history_log.read(start=start, end=end))
 
 
 # Test the sentiment analyzer
@@ -0,0 +1,263 @@
+"""
+Sentiment Scoring Backends
+Pluggable scorers behind SentimentAnalyzer: VADER (default) and a
+transformer sequence-classification model with CPU micro-batching
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class SentimentBackend:
+    """
+    Interface for sentiment scorers.
+    score_batch(texts) returns one dict per text, in order, with VADER-style
+    keys: 'compound' (-1..1), 'pos', 'neg' and 'neu'.
+    """
+    name = 'base'
+
+    def score(self, text):
+        """Score a single text"""
+        return self.score_batch([text])[0]
+
+    def score_batch(self, texts):
+        raise NotImplementedError
+
+    def close(self):
+        """Release any background resources"""
+
+
+class VaderBackend(SentimentBackend):
+    """Rule-based VADER scoring (the analyzer's default)"""
+    name = 'vader'
+
+    def __init__(self, vader=None):
+        if vader is None:
+            from sentiment_snapshot import load_vader
+            vader, _ = load_vader()
+        self.vader = vader
+        # polarity_scores only rewrites non-ASCII emoji characters, so ASCII
+        # text can skip that pass
+        self._ascii_safe = not any(emoji.isascii() for emoji in vader.emojis)
+
+    def score(self, text):
+        return self.vader.polarity_scores(text)
+
+    def score_tokens(self, tokens):
+        """
+        Score a MessageTokens using its already split words.
+        Runs the same steps as polarity_scores but skips the per-character
+        emoji pass for ASCII text and does not split the text again.
+        """
+        if not (tokens.is_ascii and self._ascii_safe):
+            return self.vader.polarity_scores(tokens.text)
+
+        from vaderSentiment.vaderSentiment import BOOSTER_DICT, SentiText, allcap_differential
+
+        words = [SentiText._strip_punc_if_word(word) for word in tokens.words]
+        sentitext = SentiText.__new__(SentiText)
+        sentitext.text = tokens.text
+        sentitext.words_and_emoticons = words
+        sentitext.is_cap_diff = allcap_differential(words)
+
+        vader = self.vader
+        sentiments = []
+        last = len(words) - 1
+        for i, item in enumerate(words):
+            lowered = item.lower()
+            # Modifiers and "kind of" carry no valence themselves
+            if lowered in BOOSTER_DICT or (i < last and lowered == 'kind' and words[i + 1].lower() == 'of'):
+                sentiments.append(0)
+                continue
+            sentiments = vader.sentiment_valence(0, sentitext, item, i, sentiments)
+
+        sentiments = vader._but_check(words, sentiments)
+        return vader.score_valence(sentiments, tokens.text)
+
+    def score_batch(self, texts):
+        polarity_scores = self.vader.polarity_scores
+        return [polarity_scores(text) for text in texts]
+
+
+class DynamicBatcher:
+    """
+    Collects concurrent single-item requests into micro-batches.
+    A worker thread waits for the first queued item, then keeps collecting
+    until max_batch_size items are queued or max_wait_ms has passed since
+    the first one, and runs score_batch once for the whole group.
+    """
+    def __init__(self, score_batch, max_batch_size=16, max_wait_ms=5.0):
+        self.score_batch = score_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.batches = 0
+        self.items = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='sentiment-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, text):
+        """Queue a text and get a Future for its score"""
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        if batch[0] is None:
+            return None
+        deadline = time.monotonic() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Put the stop marker back so the loop exits after this batch
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            texts = [text for text, _ in batch]
+            try:
+                scores = self.score_batch(texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            for (_, future), score in zip(batch, scores):
+                future.set_result(score)
+
+    def stats(self):
+        """Get batch counts and the average batch size"""
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'average_batch_size': self.items / self.batches if self.batches else 0.0,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait_ms
+        }
+
+    def close(self):
+        """Stop the worker once queued items are scored"""
+        self._queue.put(None)
+        self._thread.join()
+
+
+class TransformerBackend(SentimentBackend):
+    """
+    Transformer sequence-classification model scored on CPU.
+    model_path is a Hugging Face model id or local checkpoint directory; with
+    local_files_only=True nothing is downloaded. Single-text calls from
+    concurrent requests are grouped by a DynamicBatcher; score_batch runs
+    the model directly on already-batched input.
+    The model's labels are mapped to negative/neutral/positive probabilities
+    and compound is P(positive) - P(negative).
+    """
+    name = 'transformer'
+
+    def __init__(self, model_path, max_batch_size=16, max_wait_ms=5.0,
+                 max_length=128, local_files_only=True, num_threads=None):
+        # Heavy imports stay out of module load for VADER-only deployments
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+        if num_threads is not None:
+            torch.set_num_threads(num_threads)
+
+        self.torch = torch
+        self.max_length = max_length
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path, local_files_only=local_files_only)
+        self.model = AutoModelForSequenceClassification.from_pretrained(
+            model_path, local_files_only=local_files_only
+        )
+        self.model.eval()
+        self.label_indices = self._label_indices(self.model.config.id2label)
+        self.batcher = DynamicBatcher(self._run_model, max_batch_size, max_wait_ms)
+
+    @staticmethod
+    def _label_indices(id2label):
+        """Map 'negative'/'neutral'/'positive' to output indices"""
+        indices = {}
+        for index, label in id2label.items():
+            label = label.lower()
+            for sentiment in ('negative', 'neutral', 'positive'):
+                if label.startswith(sentiment[:3]):
+                    indices[sentiment] = int(index)
+        if 'negative' in indices and 'positive' in indices:
+            return indices
+
+        # Generic LABEL_n names: assume negative..positive order
+        if len(id2label) == 2:
+            return {'negative': 0, 'positive': 1}
+        if len(id2label) == 3:
+            return {'negative': 0, 'neutral': 1, 'positive': 2}
+        raise ValueError(f"Cannot map model labels to sentiment: {sorted(id2label.values())}")
+
+    def _run_model(self, texts):
+        encoded = self.tokenizer(texts, padding=True, truncation=True,
+                                 max_length=self.max_length, return_tensors='pt')
+        with self.torch.inference_mode():
+            probabilities = self.torch.softmax(self.model(**encoded).logits, dim=-1).tolist()
+
+        scores = []
+        for row in probabilities:
+            neg = row[self.label_indices['negative']]
+            pos = row[self.label_indices['positive']]
+            neu = row[self.label_indices['neutral']] if 'neutral' in self.label_indices else 0.0
+            scores.append({
+                'neg': round(neg, 3),
+                'neu': round(neu, 3),
+                'pos': round(pos, 3),
+                'compound': round(pos - neg, 4)
+            })
+        return scores
+
+    def score(self, text):
+        return self.batcher.submit(text).result()
+
+    def score_batch(self, texts):
+        scores = []
+        for start in range(0, len(texts), self.batcher.max_batch_size):
+            scores.extend(self._run_model(texts[start:start + self.batcher.max_batch_size]))
+        return scores
+
+    def close(self):
+        self.batcher.close()
+
+
+def build_test_checkpoint(directory, vocabulary=None):
+    """
+    Write a tiny randomly initialized 3-label BERT checkpoint for offline
+    tests of TransformerBackend. Its scores are meaningless; it only
+    exercises tokenization, batching and label mapping.
+    """
+    from transformers import BertConfig, BertForSequenceClassification, BertTokenizer
+
+    os.makedirs(directory, exist_ok=True)
+    words = vocabulary or ['i', 'am', 'so', 'worried', 'about', 'my', 'debt', 'thank',
+                           'you', 'help', 'budget', 'save', 'money', 'invest', 'great']
+    vocab_path = os.path.join(directory, 'vocab.txt')
+    with open(vocab_path, 'w') as f:
+        f.write('\n'.join(['[PAD]', '[UNK]', '[CLS]', '[SEP]', '[MASK]'] + list(words)) + '\n')
+
+    config = BertConfig(
+        vocab_size=len(words) + 5, hidden_size=16, num_hidden_layers=1,
+        num_attention_heads=2, intermediate_size=32, max_position_embeddings=128,
+        id2label={0: 'negative', 1: 'neutral', 2: 'positive'},
+        label2id={'negative': 0, 'neutral': 1, 'positive': 2}
+    )
+    BertForSequenceClassification(config).save_pretrained(directory)
+    BertTokenizer(vocab_path).save_pretrained(directory)
+    return directory
@@ -0,0 +1,264 @@
+"""
+Sentiment Analyzer Benchmarks
+Reproducible throughput, latency and memory benchmarks for sentiment_analyzer.py
+
+Usage:
+    python sentiment_benchmark.py                          # run and print
+    python sentiment_benchmark.py --output results.json    # save results
+    python sentiment_benchmark.py --compare baseline.json  # diff against a saved run
+"""
+import argparse
+import gc
+import json
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+
+from sentiment_analyzer import SentimentAnalyzer, SCORING_PROFILES
+
+SAMPLE_MESSAGES = [
+    "I'm so worried about my debt",
+    "Thank you so much for your help!",
+    "I don't understand how to budget",
+    "This is really frustrating, I can't save any money",
+    "I'm excited to start investing!",
+    "I think I need to check my balance",
+    "My credit card bill is way higher than I expected this month and I'm panicking",
+    "Can you help me set up a SIP for my retirement?"
+]
+
+# Building blocks for the synthetic finance-chat corpora
+_OPENERS = ["I", "Honestly I", "My wife and I", "Today I", "Lately I", "We"]
+_FEELINGS = [
+    "am worried about", "feel stressed about", "am confused about", "am excited about",
+    "hate dealing with", "really appreciate help with", "am hopeful about", "need help with",
+    "am frustrated with", "am looking forward to", "don't understand", "want to improve"
+]
+_TOPICS = [
+    "my credit card debt", "the home loan EMI", "my monthly budget", "this SIP",
+    "my emergency fund", "the stock market crash", "my salary hike", "the tax filing",
+    "my retirement savings", "these bank charges", "the mutual fund returns", "my rent"
+]
+_TAILS = [
+    "", "!", "?", "...", " :(", " :)", " right now.", " this month.",
+    " but I can't figure it out.", " and it is getting better.", ", thanks!"
+]
+
+# name -> (number of messages, sentences per message)
+CORPORA = {
+    'short': (2000, (1, 1)),
+    'medium': (1000, (2, 4)),
+    'long': (200, (8, 16))
+}
+
+
+def _sentence(rng):
+    return f"{rng.choice(_OPENERS)} {rng.choice(_FEELINGS)} {rng.choice(_TOPICS)}{rng.choice(_TAILS)}"
+
+
+def build_corpus(name, seed=42):
+    """Build a fixed synthetic corpus; the same name and seed always give the same messages"""
+    count, (low, high) = CORPORA[name]
+    rng = random.Random(f"{name}-{seed}")
+    return [' '.join(_sentence(rng) for _ in range(rng.randint(low, high))) for _ in range(count)]
+
+
+def _percentile(sorted_values, fraction):
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def _measure(operation, inputs):
+    """Time operation once per input; returns throughput and latency percentiles"""
+    operation(inputs[0])  # warm-up
+    latencies = []
+    start = time.perf_counter()
+    for item in inputs:
+        call_start = time.perf_counter_ns()
+        operation(item)
+        latencies.append(time.perf_counter_ns() - call_start)
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'calls': len(inputs),
+        'ops_per_second': len(inputs) / elapsed,
+        'mean_ms': sum(latencies) / len(latencies) / 1e6,
+        'p50_ms': _percentile(latencies, 0.50) / 1e6,
+        'p95_ms': _percentile(latencies, 0.95) / 1e6,
+        'p99_ms': _percentile(latencies, 0.99) / 1e6
+    }
+
+
+def _peak_memory(operation, inputs):
+    """Peak traced allocation in KiB while running operation over inputs"""
+    tracemalloc.start()
+    try:
+        for item in inputs:
+            operation(item)
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def memory_per_message(count=5000, seed=42):
+    """
+    Traced memory held per analyzed message, split into the returned result
+    objects and what the analyzer keeps in history (entries plus rollups).
+    Returns: dict of bytes per message
+    """
+    corpus = (build_corpus('short', seed) * (count // CORPORA['short'][0] + 1))[:count]
+    analyzer = SentimentAnalyzer(cache_size=0, history_limit=count)
+    analyzer.analyze_sentiment(corpus[0])  # warm-up
+    analyzer.history.replace([])
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        results = [analyzer.analyze_sentiment(text) for text in corpus]
+        gc.collect()
+        with_results = tracemalloc.get_traced_memory()[0] - base
+        del results
+        gc.collect()
+        history = tracemalloc.get_traced_memory()[0] - base
+    finally:
+        tracemalloc.stop()
+    return {
+        'messages': count,
+        'result_bytes': (with_results - history) / count,
+        'history_bytes': history / count
+    }
+
+
+def _operations(analyzer):
+    """Benchmarked operations, each taking one message"""
+    return {
+        'analyze_sentiment': analyzer.analyze_sentiment,
+        'analyze_sentiment_fast': lambda text: analyzer.analyze_sentiment(text, profile='fast'),
+        '_detect_emotions': lambda text: analyzer._detect_emotions(text.lower()),
+        'get_sentiment_summary': lambda text: analyzer.get_sentiment_summary()
+    }
+
+
+def run_suite(corpora=tuple(CORPORA), seed=42, memory=True):
+    """
+    Run every benchmark on every corpus.
+    The result cache is disabled so repeated messages are really scored.
+    Returns: JSON-serializable results dict
+    """
+    results = {'meta': _metadata(seed), 'benchmarks': {}}
+    for name in corpora:
+        corpus = build_corpus(name, seed)
+        analyzer = SentimentAnalyzer(cache_size=0, history_limit=1000)
+        # Give get_sentiment_summary a realistic amount of history
+        analyzer.analyze_batch(corpus[:200])
+
+        for operation_name, operation in _operations(analyzer).items():
+            stats = _measure(operation, corpus)
+            if memory:
+                stats['peak_memory_kib'] = _peak_memory(operation, corpus[:200])
+            results['benchmarks'][f"{name}/{operation_name}"] = stats
+    return results
+
+
+def _metadata(seed):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': seed,
+        'corpora': {name: CORPORA[name][0] for name in CORPORA},
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+
+
+def compare(baseline, current):
+    """
+    Compare two suite results.
+    Returns: dict of benchmark -> throughput and p95 ratios (current / baseline)
+    """
+    comparison = {}
+    for name, stats in current['benchmarks'].items():
+        before = baseline['benchmarks'].get(name)
+        if before is None:
+            continue
+        comparison[name] = {
+            'ops_per_second_ratio': stats['ops_per_second'] / before['ops_per_second'],
+            'p95_ratio': stats['p95_ms'] / before['p95_ms'] if before['p95_ms'] else None
+        }
+    return comparison
+
+
+def benchmark_profiles(messages=SAMPLE_MESSAGES, rounds=200):
+    """
+    Time analyze_sentiment for every scoring profile.
+    The result cache is disabled so every call does the full scoring work.
+    Returns: dict of profile -> mean latency in milliseconds
+    """
+    analyzer = SentimentAnalyzer(cache_size=0, history_limit=len(messages))
+    latencies = {}
+    for profile in SCORING_PROFILES:
+        # Warm up lazily loaded lexicons before timing
+        analyzer.analyze_sentiment(messages[0], profile=profile)
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for message in messages:
+                analyzer.analyze_sentiment(message, profile=profile)
+        elapsed = time.perf_counter() - start
+        latencies[profile] = elapsed * 1000 / (rounds * len(messages))
+    return latencies
+
+
+def _print_results(results, comparison=None):
+    print(f"{'benchmark':<40}{'ops/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'peak KiB':>11}")
+    for name, stats in results['benchmarks'].items():
+        line = (f"{name:<40}{stats['ops_per_second']:>12.1f}{stats['p50_ms']:>10.3f}"
+                f"{stats['p95_ms']:>10.3f}{stats['p99_ms']:>10.3f}{stats.get('peak_memory_kib', 0):>11.1f}")
+        if comparison and name in comparison:
+            line += f"   x{comparison[name]['ops_per_second_ratio']:.2f} ops/s"
+        print(line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sentiment analyzer benchmarks')
+    parser.add_argument('--corpus', action='append', choices=sorted(CORPORA),
+                        help='corpus to run (repeatable, default: all)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-memory', action='store_true', help='skip tracemalloc peak memory runs')
+    parser.add_argument('--output', help='write results JSON to this file')
+    parser.add_argument('--compare', help='results JSON from an earlier run to compare against')
+    parser.add_argument('--profiles', action='store_true', help='only compare scoring profile latency')
+    parser.add_argument('--message-memory', action='store_true',
+                        help='only measure memory held per analyzed message')
+    args = parser.parse_args()
+
+    if args.message_memory:
+        memory = memory_per_message(seed=args.seed)
+        print(f"result:  {memory['result_bytes']:.0f} bytes/message")
+        print(f"history: {memory['history_bytes']:.0f} bytes/message")
+    elif args.profiles:
+        print("=== Scoring Profile Latency ===\n")
+        latencies = benchmark_profiles()
+        for profile, latency in latencies.items():
+            print(f"{profile:>5}: {latency:.3f} ms/message")
+        print(f"\nfast is {latencies['full'] / latencies['fast']:.1f}x faster than full")
+    else:
+        results = run_suite(tuple(args.corpus or CORPORA), args.seed, memory=not args.no_memory)
+        comparison = None
+        if args.compare:
+            with open(args.compare, 'r') as f:
+                comparison = compare(json.load(f), results)
+            results['comparison'] = comparison
+        _print_results(results, comparison)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2)
+            print(f"\nResults written to {args.output}")
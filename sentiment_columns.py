@@ -0,0 +1,179 @@
+"""
+Columnar Sentiment History
+Keeps sentiment history in typed NumPy arrays for compact storage and
+vectorized time-range aggregation
+"""
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+
+from sentiment_analyzer import EMOTION_LEXICON
+
+# Sentiment labels by their stored code
+SENTIMENT_CODES = ('negative', 'neutral', 'positive')
+_SENTIMENT_INDEX = {sentiment: code for code, sentiment in enumerate(SENTIMENT_CODES)}
+
+_COLUMNS = {
+    'timestamp': np.float64,
+    'compound': np.float32,
+    'sentiment': np.int8,
+    'emotions': np.uint32
+}
+
+
+def _epoch(value):
+    """Convert a datetime or ISO string to epoch seconds"""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.timestamp()
+
+
+class ColumnarSentimentStore:
+    """
+    Sentiment history stored column by column.
+    Epoch timestamps, compound scores, sentiment codes and emotion bitmasks
+    live in typed arrays (about 17 bytes per message); message text is kept
+    in a separate side table. Time ranges are found with a binary search,
+    so the columns are kept in time order: a message appended out of order
+    (concurrent requests can finish in any order) marks the store unsorted,
+    and it is stably re-sorted before the next read.
+    """
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self.texts = []
+        self.emotion_names = list(EMOTION_LEXICON)
+        self._emotion_bits = {name: bit for bit, name in enumerate(self.emotion_names)}
+        self._arrays = {name: np.empty(capacity, dtype) for name, dtype in _COLUMNS.items()}
+        self._sorted = True
+
+    def __len__(self):
+        return self.size
+
+    def column(self, name):
+        """Get a read-only view of the filled part of a column, in time order"""
+        self._ensure_sorted()
+        view = self._arrays[name][:self.size]
+        view.flags.writeable = False
+        return view
+
+    def _grow(self):
+        capacity = max(2 * len(self._arrays['timestamp']), 1024)
+        for name, array in self._arrays.items():
+            grown = np.empty(capacity, array.dtype)
+            grown[:self.size] = array[:self.size]
+            self._arrays[name] = grown
+
+    def _ensure_sorted(self):
+        if self._sorted:
+            return
+        order = np.argsort(self._arrays['timestamp'][:self.size], kind='stable')
+        for name, array in self._arrays.items():
+            self._arrays[name] = array[:self.size][order]
+        self.texts = [self.texts[i] for i in order]
+        self._sorted = True
+
+    def _emotion_mask(self, emotions):
+        mask = 0
+        for emotion in emotions:
+            bit = self._emotion_bits.get(emotion)
+            if bit is None:
+                bit = len(self.emotion_names)
+                self.emotion_names.append(emotion)
+                self._emotion_bits[emotion] = bit
+            mask |= 1 << bit
+        return mask
+
+    def append(self, text, sentiment, compound, emotions, timestamp):
+        """Add one message; timestamp is a datetime, ISO string or epoch seconds"""
+        # Memory-mapped arrays from load() are read-only, so the first
+        # append copies them into writable ones
+        if self.size == len(self._arrays['timestamp']) or not self._arrays['timestamp'].flags.writeable:
+            self._grow()
+
+        index = self.size
+        epoch = _epoch(timestamp)
+        if index and epoch < self._arrays['timestamp'][index - 1]:
+            self._sorted = False
+        self._arrays['timestamp'][index] = epoch
+        self._arrays['compound'][index] = compound
+        self._arrays['sentiment'][index] = _SENTIMENT_INDEX[sentiment]
+        self._arrays['emotions'][index] = self._emotion_mask(emotions)
+        self.texts.append(text)
+        self.size += 1
+
+    def append_result(self, text, result):
+        """Add a message from an analyze_sentiment result"""
+        self.append(text, result['sentiment'], result['compound'],
+                    result['emotions'], result['timestamp'])
+
+    def _range(self, start, end):
+        self._ensure_sorted()
+        timestamps = self._arrays['timestamp'][:self.size]
+        lo = 0 if start is None else np.searchsorted(timestamps, _epoch(start), side='left')
+        hi = self.size if end is None else np.searchsorted(timestamps, _epoch(end), side='right')
+        return lo, hi
+
+    def aggregate(self, start=None, end=None):
+        """
+        Summarize messages with start <= timestamp <= end (either may be None).
+        Returns: dict with counts, compound mean/std and per-emotion counts,
+        or None when no messages fall in the range
+        """
+        lo, hi = self._range(start, end)
+        if hi <= lo:
+            return None
+
+        compound = self._arrays['compound'][lo:hi].astype(np.float64)
+        sentiment_counts = np.bincount(self._arrays['sentiment'][lo:hi], minlength=len(SENTIMENT_CODES))
+        emotions = self._arrays['emotions'][lo:hi]
+        avg_compound = float(compound.mean())
+
+        summary = {
+            'total_messages': int(hi - lo),
+            'average_sentiment': avg_compound,
+            'sentiment_std_dev': float(compound.std()),
+            'emotions': {
+                name: int(np.count_nonzero(emotions & np.uint32(1 << bit)))
+                for bit, name in enumerate(self.emotion_names)
+            },
+            'overall_mood': 'positive' if avg_compound > 0.1 else 'negative' if avg_compound < -0.1 else 'neutral'
+        }
+        for code, sentiment in enumerate(SENTIMENT_CODES):
+            summary[sentiment] = int(sentiment_counts[code])
+        return summary
+
+    def texts_between(self, start=None, end=None):
+        """Get message texts in a time range"""
+        lo, hi = self._range(start, end)
+        return self.texts[lo:hi]
+
+    def save(self, directory):
+        """Write each column to its own .npy file plus a JSON side table"""
+        self._ensure_sorted()
+        os.makedirs(directory, exist_ok=True)
+        for name in _COLUMNS:
+            np.save(os.path.join(directory, f"{name}.npy"), self._arrays[name][:self.size])
+        with open(os.path.join(directory, 'texts.json'), 'w') as f:
+            json.dump({'emotion_names': self.emotion_names, 'texts': self.texts}, f)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """
+        Load a saved store. With mmap=True the columns are memory-mapped
+        read-only, so only the pages a query touches are read from disk.
+        """
+        store = cls(capacity=0)
+        for name in _COLUMNS:
+            store._arrays[name] = np.load(os.path.join(directory, f"{name}.npy"),
+                                          mmap_mode='r' if mmap else None)
+        with open(os.path.join(directory, 'texts.json'), 'r') as f:
+            side_table = json.load(f)
+        store.texts = side_table['texts']
+        store.emotion_names = side_table['emotion_names']
+        store._emotion_bits = {name: bit for bit, name in enumerate(store.emotion_names)}
+        store.size = len(store.texts)
+        return store
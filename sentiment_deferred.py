@@ -0,0 +1,84 @@
+"""
+Deferred Sentiment Analysis
+Scores messages on a background executor so a reply can be sent before
+sentiment is ready; results are looked up (or waited on) by message id
+"""
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+
+class DeferredSentiment:
+    """
+    Background sentiment scoring keyed by message id.
+    With the default single worker, messages are scored (and recorded in
+    history) in the order they were submitted. Only the newest max_results
+    results are kept for lookup. on_result(message_id, result), if given,
+    is called from the worker thread as each message finishes, for pushing
+    results to clients.
+    """
+    def __init__(self, analyzer, workers=1, max_results=10000, on_result=None):
+        self.analyzer = analyzer
+        self.max_results = max_results
+        self.on_result = on_result
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self._futures = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix='sentiment-deferred')
+
+    def submit(self, text, session_id=None, profile='full'):
+        """Queue a message for scoring and get its message id"""
+        message_id = uuid.uuid4().hex
+        future = self._executor.submit(self._analyze, message_id, text, session_id, profile)
+        with self._lock:
+            self._futures[message_id] = future
+            self.submitted += 1
+            while len(self._futures) > self.max_results:
+                self._futures.popitem(last=False)
+        return message_id
+
+    def _analyze(self, message_id, text, session_id, profile):
+        try:
+            result = self.analyzer.analyze_sentiment(text, session_id=session_id, profile=profile)
+        except Exception:
+            self.failed += 1
+            raise
+        self.completed += 1
+        if self.on_result is not None:
+            self.on_result(message_id, result)
+        return result
+
+    def get(self, message_id, timeout=None):
+        """
+        Look up a message's sentiment, waiting up to timeout seconds for it.
+        Returns: (status, result) with status 'done', 'pending' or 'error'
+        (result is the error message), or None for an unknown id
+        """
+        with self._lock:
+            future = self._futures.get(message_id)
+        if future is None:
+            return None
+
+        try:
+            return 'done', future.result(timeout=timeout or 0)
+        except FutureTimeoutError:
+            return 'pending', None
+        except Exception as e:
+            return 'error', str(e)
+
+    def stats(self):
+        """Get submitted/completed/failed counts and the pending backlog"""
+        return {
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'failed': self.failed,
+            'pending': self.submitted - self.completed - self.failed,
+            'stored_results': len(self._futures)
+        }
+
+    def close(self):
+        """Finish queued messages and stop the worker threads"""
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,143 @@
+"""
+Sentiment Drift Alerts
+Per-user exponentially weighted sentiment state, updated in O(1) per message,
+that emits an event when a user's mood falls sharply
+"""
+import queue
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+# Emotions that count towards the distress rate
+DISTRESS_EMOTIONS = ('stressed', 'frustrated')
+
+
+class _DriftState:
+    """EWMA state for one user"""
+    __slots__ = ('fast', 'slow', 'distress', 'messages', 'alerting', 'last_seen')
+
+    def __init__(self, compound, distressed, timestamp):
+        self.fast = self.slow = compound
+        self.distress = 1.0 if distressed else 0.0
+        self.messages = 1
+        self.alerting = False
+        self.last_seen = timestamp
+
+    def to_dict(self):
+        return {
+            'fast_compound': self.fast,
+            'slow_compound': self.slow,
+            'distress_rate': self.distress,
+            'messages': self.messages,
+            'alerting': self.alerting
+        }
+
+
+class SentimentDriftMonitor:
+    """
+    Tracks each user's compound score with a fast and a slow EWMA, plus an
+    EWMA of how often their messages carry distress emotions.
+    A drift event fires when, after min_messages messages, the fast average
+    has fallen drop_threshold below the slow one and sits below mood_floor,
+    or when the distress rate reaches distress_threshold. It fires once per
+    episode: the user is re-armed when the fast average recovers above
+    mood_floor and the distress rate falls below distress_threshold.
+    Events go to on_drift(event), if given, and to the events queue; when the
+    queue is full the event is dropped (and counted) rather than blocking.
+    Only the max_users most recently seen users are tracked.
+    """
+    def __init__(self, fast_alpha=0.5, slow_alpha=0.1, drop_threshold=0.4, mood_floor=-0.2,
+                 distress_threshold=0.6, min_messages=3, distress_emotions=DISTRESS_EMOTIONS,
+                 on_drift=None, max_events=1000, max_users=10000):
+        self.fast_alpha = fast_alpha
+        self.slow_alpha = slow_alpha
+        self.drop_threshold = drop_threshold
+        self.mood_floor = mood_floor
+        self.distress_threshold = distress_threshold
+        self.min_messages = min_messages
+        self.distress_emotions = frozenset(distress_emotions)
+        self.on_drift = on_drift
+        self.max_users = max_users
+        self.events = queue.Queue(maxsize=max_events)
+        self.emitted = 0
+        self.dropped = 0
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def observe(self, user_id, result):
+        """
+        Update a user's state from an analyze_sentiment result (or history entry).
+        Returns: the drift event fired by this message, or None
+        """
+        compound = result.compound
+        distressed = not self.distress_emotions.isdisjoint(result.emotions) if result.emotion_mask else False
+        timestamp = result.timestamp if result.timestamp is not None else time.time()
+
+        with self._lock:
+            state = self._users.get(user_id)
+            if state is None:
+                state = self._users[user_id] = _DriftState(compound, distressed, timestamp)
+                if len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+            else:
+                self._users.move_to_end(user_id)
+                state.fast += self.fast_alpha * (compound - state.fast)
+                state.slow += self.slow_alpha * (compound - state.slow)
+                state.distress += self.fast_alpha * ((1.0 if distressed else 0.0) - state.distress)
+                state.messages += 1
+                state.last_seen = timestamp
+            event = self._check(user_id, state, compound)
+
+        if event is not None:
+            self._emit(event)
+        return event
+
+    def _check(self, user_id, state, compound):
+        mood_drop = state.fast - state.slow <= -self.drop_threshold and state.fast < self.mood_floor
+        distress = state.distress >= self.distress_threshold
+        if state.alerting:
+            if state.fast >= self.mood_floor and not distress:
+                state.alerting = False
+            return None
+        if state.messages < self.min_messages or not (mood_drop or distress):
+            return None
+
+        state.alerting = True
+        return dict(state.to_dict(), user_id=user_id, compound=compound,
+                    reasons=[reason for reason, fired in (('mood_drop', mood_drop), ('distress', distress)) if fired],
+                    timestamp=datetime.fromtimestamp(state.last_seen).isoformat())
+
+    def _emit(self, event):
+        self.emitted += 1
+        try:
+            self.events.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+        if self.on_drift is not None:
+            self.on_drift(event)
+
+    def drain(self, max_events=None):
+        """Take queued events, oldest first"""
+        events = []
+        while max_events is None or len(events) < max_events:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                break
+        return events
+
+    def state(self, user_id):
+        """Get a user's current EWMA state, or None if they are not tracked"""
+        with self._lock:
+            state = self._users.get(user_id)
+            return state.to_dict() if state is not None else None
+
+    def stats(self):
+        """Get tracked user and event counts"""
+        return {
+            'users': len(self._users),
+            'emitted': self.emitted,
+            'dropped': self.dropped,
+            'queued': self.events.qsize()
+        }
@@ -0,0 +1,648 @@
+"""
+Sentiment History Tracking
+Keeps recent per-message sentiment records plus running all-time aggregates
+"""
+import atexit
+import bisect
+import glob
+import itertools
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from operator import attrgetter
+
+from sentiment_result import HistoryEntry, to_json
+
+
+def _summarize(total, counts, compound_sum, m2):
+    """Build a summary dict from running aggregates"""
+    avg_compound = compound_sum / total
+    variance = m2 / total
+    return {
+        'total_messages': total,
+        'positive': counts['positive'],
+        'negative': counts['negative'],
+        'neutral': counts['neutral'],
+        'average_sentiment': avg_compound,
+        'sentiment_variance': variance,
+        'sentiment_std_dev': math.sqrt(variance),
+        'overall_mood': 'positive' if avg_compound > 0.1 else 'negative' if avg_compound < -0.1 else 'neutral'
+    }
+
+
+class SentimentWindow:
+    """
+    Running aggregates over a sliding window of the last max_messages
+    messages and/or the last max_seconds seconds.
+    Welford's update is applied on insert and reversed on eviction, so each
+    message costs O(1) amortized.
+    """
+    def __init__(self, max_messages=None, max_seconds=None):
+        self.max_messages = max_messages
+        self.max_seconds = max_seconds
+        self._items = deque()
+        self.compound_sum = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.counts = {'positive': 0, 'negative': 0, 'neutral': 0}
+
+    def add(self, epoch, compound, sentiment):
+        """Add a message scored at epoch (seconds)"""
+        self._items.append((epoch, compound, sentiment))
+        self.compound_sum += compound
+        self.counts[sentiment] += 1
+        delta = compound - self.mean
+        self.mean += delta / len(self._items)
+        self.m2 += delta * (compound - self.mean)
+        self._evict(epoch)
+
+    def _remove_oldest(self):
+        _, compound, sentiment = self._items.popleft()
+        self.compound_sum -= compound
+        self.counts[sentiment] -= 1
+        if not self._items:
+            self.compound_sum = self.mean = self.m2 = 0.0
+            return
+        delta = compound - self.mean
+        self.mean -= delta / len(self._items)
+        self.m2 = max(self.m2 - delta * (compound - self.mean), 0.0)
+
+    def _evict(self, now):
+        if self.max_messages is not None:
+            while len(self._items) > self.max_messages:
+                self._remove_oldest()
+        if self.max_seconds is not None:
+            cutoff = now - self.max_seconds
+            while self._items and self._items[0][0] < cutoff:
+                self._remove_oldest()
+
+    def summary(self, now=None):
+        """Get aggregates for the window, or None when it is empty"""
+        self._evict(time.time() if now is None else now)
+        if not self._items:
+            return None
+        return _summarize(len(self._items), self.counts, self.compound_sum, self.m2)
+
+
+class _RollupBucket:
+    __slots__ = ('count', 'compound_sum', 'counts', 'emotions')
+
+    def __init__(self):
+        self.count = 0
+        self.compound_sum = 0.0
+        self.counts = {'positive': 0, 'negative': 0, 'neutral': 0}
+        self.emotions = {}
+
+
+class SentimentRollup:
+    """
+    Fixed-width time buckets (count, compound sum, sentiment and emotion
+    counts) updated as each message arrives, so a trend over a time range
+    costs O(buckets in range) instead of a pass over every message.
+    Only the newest max_buckets buckets are kept.
+    """
+    def __init__(self, bucket_seconds, max_buckets):
+        self.bucket_seconds = bucket_seconds
+        self.max_buckets = max_buckets
+        self._buckets = {}
+        self._keys = []  # bucket indexes, sorted
+
+    def add(self, epoch, compound, sentiment, emotions=()):
+        """Count a message scored at epoch (seconds)"""
+        key = int(epoch // self.bucket_seconds)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            keys = self._keys
+            if len(keys) >= self.max_buckets and key < keys[0]:
+                # Older than everything retained
+                return
+            bucket = self._buckets[key] = _RollupBucket()
+            if not keys or key > keys[-1]:
+                keys.append(key)
+            else:
+                bisect.insort(keys, key)
+            if len(keys) > self.max_buckets:
+                del self._buckets[keys.pop(0)]
+
+        bucket.count += 1
+        bucket.compound_sum += compound
+        bucket.counts[sentiment] += 1
+        for emotion in emotions:
+            bucket.emotions[emotion] = bucket.emotions.get(emotion, 0) + 1
+
+    def series(self, start=None, end=None):
+        """
+        Get the non-empty buckets overlapping start..end (epoch seconds,
+        either may be None), oldest first.
+        Buckets are aligned to UTC, so their starts are reported in UTC with
+        an explicit offset; in a zone like +05:30 a local label would put
+        hourly buckets at half past.
+        """
+        keys = self._keys
+        lo = 0 if start is None else bisect.bisect_left(keys, int(start // self.bucket_seconds))
+        hi = len(keys) if end is None else bisect.bisect_right(keys, int(end // self.bucket_seconds))
+
+        series = []
+        for key in keys[lo:hi]:
+            bucket = self._buckets[key]
+            series.append({
+                'start': datetime.fromtimestamp(key * self.bucket_seconds, timezone.utc).isoformat(),
+                'count': bucket.count,
+                'average_sentiment': bucket.compound_sum / bucket.count,
+                'positive': bucket.counts['positive'],
+                'negative': bucket.counts['negative'],
+                'neutral': bucket.counts['neutral'],
+                'emotions': dict(bucket.emotions)
+            })
+        return series
+
+
+class SentimentTracker:
+    """
+    Message history for the sentiment analyzer.
+    With max_entries set, history is a fixed-capacity ring buffer; the oldest
+    entries are dropped (or appended to spill_path as JSON lines) once it is
+    full. Spilled entries are written in batches of spill_batch_size; a
+    partial batch is written by flush(), close() or at interpreter exit. Summary aggregates come from running counters (Welford for the
+    variance), so they stay exact for every message ever recorded and cost
+    O(1) to read. Windowed summaries cover the last window_messages messages
+    or the last window_minutes minutes. Per-minute and per-hour rollups
+    back time-series queries.
+    """
+    WINDOWS = ('messages', 'minutes')
+    # resolution -> (bucket seconds, buckets kept)
+    ROLLUPS = {'minute': (60, 24 * 60), 'hour': (3600, 30 * 24)}
+
+    def __init__(self, max_entries=None, spill_path=None, spill_batch_size=256,
+                 window_messages=20, window_minutes=15):
+        self.max_entries = max_entries
+        self.window_messages = window_messages
+        self.window_minutes = window_minutes
+        self.spill_path = spill_path
+        self.spill_batch_size = spill_batch_size
+        self.entries = deque(maxlen=max_entries)
+        self.spilled = 0
+        self._spill_buffer = []
+        self._reset_counters()
+        if spill_path is not None:
+            atexit.register(self.close)
+
+    def _reset_counters(self):
+        self.total = 0
+        self.compound_sum = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.counts = {'positive': 0, 'negative': 0, 'neutral': 0}
+        self.windows = {
+            'messages': SentimentWindow(max_messages=self.window_messages),
+            'minutes': SentimentWindow(max_seconds=self.window_minutes * 60)
+        }
+        self.rollups = {
+            resolution: SentimentRollup(bucket_seconds, max_buckets)
+            for resolution, (bucket_seconds, max_buckets) in self.ROLLUPS.items()
+        }
+
+    def record(self, entry):
+        """Add one history entry (HistoryEntry or its dict form) and update the running counters"""
+        entry = HistoryEntry.from_dict(entry)
+        if self.max_entries is not None and len(self.entries) == self.max_entries:
+            self._spill(self.entries[0])
+        self.entries.append(entry)
+
+        compound = entry.compound
+        sentiment = entry.sentiment
+        self.total += 1
+        self.compound_sum += compound
+        self.counts[sentiment] += 1
+        delta = compound - self.mean
+        self.mean += delta / self.total
+        self.m2 += delta * (compound - self.mean)
+
+        epoch = entry.timestamp
+        for window in self.windows.values():
+            window.add(epoch, compound, sentiment)
+        emotions = entry.emotions if entry.emotion_mask else ()
+        for rollup in self.rollups.values():
+            rollup.add(epoch, compound, sentiment, emotions)
+
+    def extend(self, entries):
+        """Add several history entries"""
+        for entry in entries:
+            self.record(entry)
+
+    def replace(self, entries):
+        """Reset history and counters to the given entries"""
+        self.flush()
+        self.entries.clear()
+        self._reset_counters()
+        for entry in entries:
+            self.record(entry)
+
+    def _spill(self, entry):
+        if self.spill_path is None:
+            return
+        self._spill_buffer.append(entry)
+        if len(self._spill_buffer) >= self.spill_batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write buffered evicted entries to the spill file"""
+        if not self._spill_buffer:
+            return
+        with open(self.spill_path, 'a') as f:
+            f.writelines(json.dumps(entry, default=to_json) + '\n' for entry in self._spill_buffer)
+        self.spilled += len(self._spill_buffer)
+        self._spill_buffer = []
+
+    def close(self):
+        """Write any evicted entries still buffered; the tracker stays usable"""
+        self.flush()
+
+    def load_spilled(self):
+        """Read entries previously spilled to disk, oldest first"""
+        if self.spill_path is None:
+            return []
+        try:
+            with open(self.spill_path, 'r') as f:
+                spilled = [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            spilled = []
+        return spilled + [entry.to_dict() for entry in self._spill_buffer]
+
+    def summary(self, window=None):
+        """
+        Get all-time aggregates, or those of a sliding window
+        ('messages' or 'minutes'). Returns None when there is nothing to report.
+        """
+        if window is not None:
+            if window not in self.windows:
+                raise ValueError(f"Unknown summary window: {window}")
+            summary = self.windows[window].summary()
+            if summary is not None:
+                summary['window'] = window
+                summary['window_size'] = self.window_messages if window == 'messages' else self.window_minutes
+            return summary
+
+        if not self.total:
+            return None
+        return _summarize(self.total, self.counts, self.compound_sum, self.m2)
+
+    def timeseries(self, resolution='minute', start=None, end=None):
+        """Get rollup buckets ('minute' or 'hour') between start and end (epoch seconds)"""
+        if resolution not in self.rollups:
+            raise ValueError(f"Unknown time-series resolution: {resolution}")
+        return self.rollups[resolution].series(start, end)
+
+
+class ThreadBufferedHistory:
+    """
+    Records history entries into a SentimentTracker shared by many request
+    threads without making writers take a lock.
+    Each thread appends to its own deque (deque.append is atomic). The
+    buffers are merged into the tracker, sorted by timestamp, under a lock
+    that only mergers take: every read merges first, and a writer merges once
+    about merge_threshold entries are pending, unless a merge is already
+    running (it never waits for one). on_merge(entries), if given, also
+    receives each merged batch.
+    Entries go to log (a SentimentHistoryLog, whose queue is lock-free too)
+    as they are recorded rather than when merged, so they reach disk on
+    its flush schedule even if nothing ever reads history.
+    """
+    def __init__(self, tracker, merge_threshold=256, on_merge=None, log=None):
+        self.tracker = tracker
+        self.log = log
+        self.merge_threshold = merge_threshold
+        self.on_merge = on_merge
+        self.merges = 0
+        self._local = threading.local()
+        # buffer id -> (owning thread, deque); ids are never reused, so
+        # buffers of finished threads can be dropped while others register
+        self._buffers = {}
+        self._buffer_ids = itertools.count()
+        # Unlocked, so concurrent updates can be lost; it only decides when
+        # a writer tries to merge
+        self._pending = 0
+        self._merge_lock = threading.Lock()
+        if tracker.spill_path is not None:
+            # Runs before the tracker's own hook (atexit is last in, first
+            # out), so entries still buffered here are evicted and spilled too
+            atexit.register(self.close)
+
+    def _buffer(self):
+        try:
+            return self._local.buffer
+        except AttributeError:
+            buffer = self._local.buffer = deque()
+            self._buffers[next(self._buffer_ids)] = (threading.current_thread(), buffer)
+            return buffer
+
+    def record(self, entry):
+        """Add one history entry from the calling thread"""
+        self._buffer().append(entry)
+        if self.log is not None:
+            self.log.append(entry)
+        self._pending += 1
+        self._maybe_merge()
+
+    def extend(self, entries):
+        """Add a list of history entries from the calling thread"""
+        self._buffer().extend(entries)
+        if self.log is not None:
+            for entry in entries:
+                self.log.append(entry)
+        self._pending += len(entries)
+        self._maybe_merge()
+
+    def _maybe_merge(self):
+        if self._pending >= self.merge_threshold and self._merge_lock.acquire(blocking=False):
+            try:
+                self._merge()
+            finally:
+                self._merge_lock.release()
+
+    def _merge(self):
+        self._pending = 0
+        entries = []
+        for buffer_id, (thread, buffer) in list(self._buffers.items()):
+            finished = not thread.is_alive()
+            # popleft is atomic too, so the owner can keep appending
+            while buffer:
+                entries.append(buffer.popleft())
+            if finished:
+                # A finished thread cannot append again
+                del self._buffers[buffer_id]
+        if not entries:
+            return
+        entries.sort(key=attrgetter('timestamp'))
+        self.tracker.extend(entries)
+        if self.on_merge is not None:
+            self.on_merge(entries)
+        self.merges += 1
+
+    def merge(self):
+        """Move every buffered entry into the tracker"""
+        with self._merge_lock:
+            self._merge()
+
+    @contextmanager
+    def reading(self):
+        """Merge, then hold off other merges while the tracker is read"""
+        with self._merge_lock:
+            self._merge()
+            yield self.tracker
+
+    def replace(self, entries):
+        """Drop buffered entries and reset the tracker to the given entries"""
+        with self._merge_lock:
+            for _, buffer in list(self._buffers.values()):
+                buffer.clear()
+            self.tracker.replace(entries)
+
+    def close(self):
+        """Merge buffered entries and write the tracker's pending spill batch"""
+        with self._merge_lock:
+            self._merge()
+            self.tracker.close()
+
+    def stats(self):
+        """Get thread buffer counts, pending entries and merges so far"""
+        buffers = list(self._buffers.values())
+        return {
+            'thread_buffers': len(buffers),
+            'pending': sum(len(buffer) for _, buffer in buffers),
+            'merges': self.merges
+        }
+
+
+def _line_timestamp(line):
+    """Pull the ISO timestamp out of a log line without parsing the JSON"""
+    start = line.find('"timestamp": "') + 14
+    return line[start:line.find('"', start)]
+
+
+class SentimentHistoryLog:
+    """
+    Append-only, segment-rotated JSON-lines history log.
+    append() only queues the entry; a background thread writes queued entries
+    every flush_interval seconds, so callers never wait on disk. A new
+    segment file is started after segment_max_entries lines.
+    Positions in the log are (segment number, byte offset) tuples.
+    Concurrent requests can queue entries slightly out of time order, so
+    time-range reads allow ORDER_SLACK_SECONDS of disorder before they stop
+    early or skip a segment.
+    """
+    SEGMENT_PATTERN = 'history-*.jsonl'
+    ORDER_SLACK_SECONDS = 60
+
+    def __init__(self, directory, segment_max_entries=10000, flush_interval=1.0):
+        self.directory = directory
+        self.segment_max_entries = segment_max_entries
+        self.flush_interval = flush_interval
+        os.makedirs(directory, exist_ok=True)
+
+        self._queue = deque()
+        self._write_lock = threading.Lock()
+        segments = self.segments()
+        self._segment = segments[-1] if segments else 0
+        self._segment_entries = self._count_lines(self._segment) if segments else 0
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='sentiment-history-log', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _path(self, segment):
+        return os.path.join(self.directory, f"history-{segment:06d}.jsonl")
+
+    def _count_lines(self, segment):
+        with open(self._path(segment), 'rb') as f:
+            return sum(1 for _ in f)
+
+    def segments(self):
+        """Segment numbers on disk, oldest first"""
+        paths = glob.glob(os.path.join(self.directory, self.SEGMENT_PATTERN))
+        return sorted(int(os.path.basename(path)[8:-6]) for path in paths)
+
+    def append(self, entry):
+        """Queue an entry for the next background flush"""
+        self._queue.append(entry)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Write all queued entries, rotating segments as they fill up"""
+        with self._write_lock:
+            while self._queue:
+                room = self.segment_max_entries - self._segment_entries
+                if room <= 0:
+                    self._segment += 1
+                    self._segment_entries = 0
+                    continue
+
+                lines = []
+                while self._queue and len(lines) < room:
+                    lines.append(json.dumps(self._queue.popleft(), default=to_json) + '\n')
+                with open(self._path(self._segment), 'a') as f:
+                    f.writelines(lines)
+                self._segment_entries += len(lines)
+
+    def close(self):
+        """Stop the background writer and flush what is left"""
+        self._stop.set()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.flush()
+
+    def read(self, offset=None, start=None, end=None):
+        """
+        Stream entries from the log, oldest first.
+        offset: (segment, byte offset) to resume from, as yielded earlier
+        start/end: only yield entries whose timestamp falls in this range
+        (datetimes or ISO strings). Segments outside the range are skipped
+        and lines outside it are never JSON-parsed.
+        Yields: (entry, offset of the next entry) tuples
+        """
+        if isinstance(start, str):
+            start = datetime.fromisoformat(start)
+        if isinstance(end, str):
+            end = datetime.fromisoformat(end)
+        slack = timedelta(seconds=self.ORDER_SLACK_SECONDS)
+        # Timestamps are compared as ISO strings, so lines are never parsed
+        skip_before = (start - slack).isoformat() if start is not None else None
+        stop_after = (end + slack).isoformat() if end is not None else None
+        start = start.isoformat() if start is not None else None
+        end = end.isoformat() if end is not None else None
+
+        segments = self.segments()
+        first_segment, position = offset if offset is not None else (segments[0] if segments else 0, 0)
+        segments = [segment for segment in segments if segment >= first_segment]
+
+        for index, segment in enumerate(segments):
+            # A segment ends (within the slack) before the next one starts,
+            # so its first line bounds the previous segment's range
+            if start is not None and index + 1 < len(segments):
+                if self._first_timestamp(segments[index + 1]) < skip_before:
+                    continue
+
+            with open(self._path(segment), 'r') as f:
+                if segment == first_segment:
+                    f.seek(position)
+                for line in iter(f.readline, ''):
+                    if not line.endswith('\n'):
+                        # Partially written line; resume here next time
+                        break
+                    timestamp = _line_timestamp(line)
+                    if end is not None and timestamp > end:
+                        if timestamp > stop_after:
+                            return
+                        continue
+                    if start is None or timestamp >= start:
+                        yield json.loads(line), (segment, f.tell())
+
+    def _first_timestamp(self, segment):
+        with open(self._path(segment), 'r') as f:
+            return _line_timestamp(f.readline())
+
+
+class _Session:
+    """Mutable sentiment state owned by one chat session"""
+    def __init__(self, tracker):
+        self.tracker = tracker
+        self.lock = threading.Lock()
+        self.last_seen = time.monotonic()
+
+
+class SessionSentimentStore:
+    """
+    Session-keyed sentiment trackers.
+    Sessions idle for longer than idle_seconds are dropped, and the least
+    recently used sessions are evicted once there are more than max_sessions
+    or more than max_total_entries history entries held across all sessions.
+    Each session records under its own lock, so sessions never wait on
+    each other.
+    """
+    def __init__(self, max_sessions=1000, idle_seconds=3600, history_limit=100,
+                 max_total_entries=50000):
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.history_limit = history_limit
+        self.max_total_entries = max_total_entries
+        self.evictions = 0
+        self._sessions = OrderedDict()
+        self._total_entries = 0
+        self._lock = threading.Lock()
+
+    def _get(self, session_id, create):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                if not create:
+                    return None
+                session = _Session(SentimentTracker(max_entries=self.history_limit))
+                self._sessions[session_id] = session
+            else:
+                self._sessions.move_to_end(session_id)
+            session.last_seen = time.monotonic()
+            self._evict(keep=session_id)
+            return session
+
+    def _evict(self, keep=None):
+        cutoff = time.monotonic() - self.idle_seconds
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session_id == keep:
+                break
+            over_limit = (len(self._sessions) > self.max_sessions
+                          or self._total_entries > self.max_total_entries)
+            if not over_limit and session.last_seen >= cutoff:
+                break
+            del self._sessions[session_id]
+            self._total_entries -= len(session.tracker.entries)
+            self.evictions += 1
+
+    def record(self, session_id, entry):
+        """Record a history entry for a session, creating it if needed"""
+        self.extend(session_id, [entry])
+
+    def extend(self, session_id, entries):
+        """Record several history entries for a session"""
+        session = self._get(session_id, create=True)
+        with session.lock:
+            held = len(session.tracker.entries)
+            session.tracker.extend(entries)
+            added = len(session.tracker.entries) - held
+        if added:
+            with self._lock:
+                self._total_entries += added
+                self._evict(keep=session_id)
+
+    def summary(self, session_id, window=None):
+        """Get a session summary, or None for unknown or empty sessions"""
+        session = self._get(session_id, create=False)
+        if session is None:
+            return None
+        with session.lock:
+            return session.tracker.summary(window)
+
+    def __contains__(self, session_id):
+        return session_id in self._sessions
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def stats(self):
+        """Get session counts and memory usage"""
+        return {
+            'sessions': len(self._sessions),
+            'max_sessions': self.max_sessions,
+            'history_entries': self._total_entries,
+            'max_total_entries': self.max_total_entries,
+            'evictions': self.evictions
+        }
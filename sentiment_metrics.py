@@ -0,0 +1,96 @@
+"""
+Sentiment Metrics
+Low-overhead latency histograms for per-stage sentiment timing, and a
+startup phase timer
+"""
+import time
+
+
+class LatencyHistogram:
+    """
+    Latency histogram with power-of-two nanosecond buckets.
+    Recording is a few integer operations; percentiles are reported as the
+    upper bound of the bucket they fall in (within a factor of two).
+    Updates are not locked, so concurrent writers may occasionally drop a
+    sample; that is acceptable for monitoring.
+    """
+    __slots__ = ('count', 'total_ns', 'max_ns', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.buckets = [0] * 64
+
+    def record(self, ns):
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+        self.buckets[min(ns.bit_length(), 63)] += 1
+
+    def percentile(self, fraction):
+        """Approximate latency (ns) below which fraction of samples fall"""
+        if not self.count:
+            return 0
+        threshold = fraction * self.count
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if seen >= threshold:
+                return min(1 << bucket, self.max_ns)
+        return self.max_ns
+
+    def snapshot(self):
+        """Get count, mean, max and p50/p95/p99 in milliseconds"""
+        return {
+            'count': self.count,
+            'mean_ms': self.total_ns / self.count / 1e6 if self.count else 0.0,
+            'max_ms': self.max_ns / 1e6,
+            'p50_ms': self.percentile(0.50) / 1e6,
+            'p95_ms': self.percentile(0.95) / 1e6,
+            'p99_ms': self.percentile(0.99) / 1e6
+        }
+
+
+class StageMetrics:
+    """One latency histogram per named processing stage"""
+    def __init__(self):
+        self.stages = {}
+
+    def record(self, timings):
+        """Record a dict of stage name -> duration in nanoseconds"""
+        stages = self.stages
+        for stage, ns in timings.items():
+            histogram = stages.get(stage)
+            if histogram is None:
+                histogram = stages[stage] = LatencyHistogram()
+            histogram.record(ns)
+
+    def snapshot(self):
+        """Get per-stage latency summaries"""
+        return {stage: histogram.snapshot() for stage, histogram in self.stages.items()}
+
+    def reset(self):
+        self.stages = {}
+
+
+class StartupTimer:
+    """Wall-clock durations of named startup phases, in the order marked"""
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases = []
+
+    def mark(self, phase):
+        """End the current phase (it began at the previous mark) and name it"""
+        now = time.perf_counter()
+        self.phases.append((phase, (now - self._last) * 1000))
+        self._last = now
+
+    def report(self):
+        """Get per-phase and total milliseconds"""
+        return {
+            'phases_ms': dict(self.phases),
+            'total_ms': (self._last - self.started) * 1000
+        }
@@ -0,0 +1,137 @@
+"""
+Sentiment Worker Pool
+Shards sentiment scoring across worker processes so scoring is not limited
+to the one core a Flask process can use
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+
+# Analyzer used inside worker processes. With the fork start method it is
+# built in the parent before the workers start, so they inherit the loaded
+# lexicons instead of parsing them again.
+_worker_analyzer = None
+
+
+def _init_worker(analyzer_kwargs, inherited):
+    global _worker_analyzer
+    if not inherited:
+        from sentiment_analyzer import SentimentAnalyzer
+        _worker_analyzer = SentimentAnalyzer(cache_size=0, **analyzer_kwargs)
+        _worker_analyzer.warm_up()
+
+
+def _ready(_):
+    return os.getpid()
+
+
+def _score_chunk(texts, profile):
+    return [_worker_analyzer._compute_scores(text, profile) for text in texts]
+
+
+class SentimentWorkerPool:
+    """
+    Process pool that scores messages on several cores.
+    Texts are split into chunks of chunk_size and results come back in input
+    order. If a worker dies, the pool is rebuilt and the affected call is
+    scored by the fallback function instead, so a crash never reaches the
+    caller.
+    Workers always score with the default VADER backend, so SentimentAnalyzer
+    refuses to combine a pool with any other backend.
+    The first workers are forked (where available), which is only safe
+    because no other threads exist yet. Restarts happen while request
+    threads are running, and forking a multi-threaded process can deadlock
+    the child, so replacement workers come from a forkserver (or spawn).
+    Those workers import the main module, which must therefore be safe to
+    import (see finance_ai_server.py).
+    """
+    def __init__(self, workers=None, chunk_size=32, analyzer_kwargs=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.analyzer_kwargs = analyzer_kwargs or {}
+        self.restarts = 0
+        self.fallbacks = 0
+        methods = multiprocessing.get_all_start_methods()
+        self._context = multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+        self._restart_context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        if self._restart_context.get_start_method() == 'forkserver':
+            # The default preload imports __main__ into the server process
+            self._restart_context.set_forkserver_preload(['sentiment_analyzer'])
+        self._lock = threading.Lock()
+        self._executor = None
+        self._start(self._context)
+
+    def _start(self, context):
+        global _worker_analyzer
+        inherited = context.get_start_method() == 'fork'
+        if inherited:
+            from sentiment_analyzer import SentimentAnalyzer
+            _worker_analyzer = SentimentAnalyzer(cache_size=0, **self.analyzer_kwargs)
+            _worker_analyzer.warm_up()
+
+        self.start_method = context.get_start_method()
+        self._executor = ProcessPoolExecutor(
+            self.workers, mp_context=context,
+            initializer=_init_worker, initargs=(self.analyzer_kwargs, inherited)
+        )
+        # Start every worker up front rather than on the first request
+        self.pids = sorted(set(self._executor.map(_ready, range(self.workers * 2))))
+
+    def _restart(self, broken):
+        with self._lock:
+            # Another thread may already have replaced the broken pool
+            if self._executor is broken:
+                broken.shutdown(wait=False, cancel_futures=True)
+                self.restarts += 1
+                self._start(self._restart_context)
+
+    def restart(self, analyzer_kwargs=None):
+        """
+        Replace the workers with fresh ones, e.g. after a lexicon reload.
+        Calls already running finish on the old workers.
+        """
+        with self._lock:
+            if analyzer_kwargs is not None:
+                self.analyzer_kwargs = analyzer_kwargs
+            old = self._executor
+            self._start(self._restart_context)
+            old.shutdown(wait=False)
+
+    def score_many(self, texts, profile='full', fallback=None):
+        """
+        Score texts across the workers.
+        fallback(texts, profile) is used when a worker crashes mid-call;
+        without one the BrokenProcessPool error is raised after the pool
+        has been rebuilt.
+        """
+        if not texts:
+            return []
+
+        executor = self._executor
+        chunks = [texts[i:i + self.chunk_size] for i in range(0, len(texts), self.chunk_size)]
+        try:
+            scored = executor.map(_score_chunk, chunks, repeat(profile))
+            return [scores for chunk in scored for scores in chunk]
+        except BrokenProcessPool:
+            self._restart(executor)
+            if fallback is None:
+                raise
+            self.fallbacks += 1
+            return fallback(texts, profile)
+
+    def stats(self):
+        """Get worker count and crash recovery counters"""
+        return {
+            'workers': self.workers,
+            'chunk_size': self.chunk_size,
+            'start_method': self.start_method,
+            'restarts': self.restarts,
+            'fallbacks': self.fallbacks
+        }
+
+    def close(self):
+        """Shut the workers down"""
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,155 @@
+"""
+Sentiment Result Types
+Compact __slots__ records for analyzer results and history entries. Emotions
+are kept as a bitmask over a shared tuple of emotion names and timestamps as
+epoch seconds; the JSON-friendly dict form is only built by to_dict(), at the
+HTTP or file boundary.
+"""
+from datetime import datetime
+
+SENTIMENT_EMOJI = {'positive': '😊', 'negative': '😟', 'neutral': '😐'}
+
+
+def emotion_mask(emotions, names):
+    """Bitmask of emotions, bit i meaning names[i]"""
+    mask = 0
+    for emotion in emotions:
+        mask |= 1 << names.index(emotion)
+    return mask
+
+
+def mask_emotions(mask, names):
+    """Emotion names set in mask, in names order"""
+    return [name for bit, name in enumerate(names) if mask >> bit & 1]
+
+
+def _epoch(timestamp):
+    if timestamp is None or isinstance(timestamp, (int, float)):
+        return timestamp
+    return datetime.fromisoformat(timestamp).timestamp()
+
+
+class _Record:
+    """
+    Read-only mapping interface shared by the result types, so code written
+    against the old dicts (record['sentiment'], record.get('polarity'))
+    keeps working. Optional fields that are None are reported as missing.
+    """
+    __slots__ = ()
+    FIELDS = ()
+
+    @property
+    def emotions(self):
+        return mask_emotions(self.emotion_mask, self.emotion_names)
+
+    @property
+    def iso_timestamp(self):
+        return datetime.fromtimestamp(self.timestamp).isoformat() if self.timestamp is not None else None
+
+    def _value(self, key):
+        if key == 'emotions':
+            return self.emotions
+        if key == 'timestamp':
+            return self.iso_timestamp
+        if key == 'emoji':
+            return SENTIMENT_EMOJI[self.sentiment]
+        return getattr(self, key)
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        value = self._value(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return key in self.FIELDS and self._value(key) is not None
+
+    def keys(self):
+        return [key for key in self.FIELDS if key in self]
+
+    def to_dict(self):
+        """Build the JSON-serializable dict form"""
+        record = {}
+        for key in self.FIELDS:
+            value = self._value(key)
+            if value is not None:
+                record[key] = value
+        return record
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class SentimentResult(_Record):
+    """
+    Scores for one message. polarity/subjectivity are None for the fast
+    profile, timings_ms is only set when timings were requested and
+    long_text describes how a long message was chunked.
+    """
+    __slots__ = ('sentiment', 'compound', 'positive', 'negative', 'neutral',
+                 'emotion_mask', 'emotion_names', 'polarity', 'subjectivity',
+                 'timestamp', 'timings_ms', 'long_text')
+    FIELDS = ('sentiment', 'emoji', 'compound', 'positive', 'negative', 'neutral',
+              'emotions', 'polarity', 'subjectivity', 'timestamp', 'timings_ms', 'long_text')
+
+    def __init__(self, sentiment, compound, positive, negative, neutral, emotion_mask,
+                 emotion_names, polarity=None, subjectivity=None, timestamp=None, timings_ms=None,
+                 long_text=None):
+        self.sentiment = sentiment
+        self.compound = compound
+        self.positive = positive
+        self.negative = negative
+        self.neutral = neutral
+        self.emotion_mask = emotion_mask
+        self.emotion_names = emotion_names
+        self.polarity = polarity
+        self.subjectivity = subjectivity
+        self.timestamp = timestamp
+        self.timings_ms = timings_ms
+        self.long_text = long_text
+
+    def copy(self, full=True):
+        """Copy the scores without timestamp or timings; full=False drops TextBlob fields"""
+        return SentimentResult(self.sentiment, self.compound, self.positive, self.negative,
+                               self.neutral, self.emotion_mask, self.emotion_names,
+                               self.polarity if full else None, self.subjectivity if full else None,
+                               long_text=self.long_text)
+
+
+class HistoryEntry(_Record):
+    """One message in sentiment history"""
+    __slots__ = ('text', 'sentiment', 'compound', 'emotion_mask', 'emotion_names', 'timestamp')
+    FIELDS = ('text', 'sentiment', 'compound', 'emotions', 'timestamp')
+
+    def __init__(self, text, sentiment, compound, emotion_mask, emotion_names, timestamp):
+        self.text = text
+        self.sentiment = sentiment
+        self.compound = compound
+        self.emotion_mask = emotion_mask
+        self.emotion_names = emotion_names
+        self.timestamp = timestamp
+
+    @classmethod
+    def from_dict(cls, entry):
+        """Build an entry from its dict form (as saved to JSON)"""
+        if isinstance(entry, cls):
+            return entry
+        # Entries saved before emotions were recorded have none
+        names = tuple(entry.get('emotions', ()))
+        return cls(entry['text'], entry['sentiment'], entry['compound'],
+                   (1 << len(names)) - 1, names, _epoch(entry['timestamp']))
+
+
+def to_json(value):
+    """json.dumps default= hook for result records"""
+    if isinstance(value, _Record):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
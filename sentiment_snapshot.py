@@ -0,0 +1,92 @@
+"""
+VADER Lexicon Snapshot
+Loads VADER's lexicon and emoji table from a precompiled marshal snapshot
+instead of parsing vaderSentiment's text files on every process start
+
+Usage:
+    python sentiment_snapshot.py            # (re)build the snapshot
+"""
+import marshal
+import os
+import time
+
+# Bumped when the snapshot layout changes
+SNAPSHOT_VERSION = 1
+
+# Kept beside the .pyc files, which are regenerated the same way
+DEFAULT_SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                     '__pycache__', 'vader_lexicon.marshal')
+
+
+def _source_key(module):
+    """Identify the installed lexicon files, so upgrades invalidate the snapshot"""
+    directory = os.path.dirname(os.path.abspath(module.__file__))
+    key = []
+    for name in ('vader_lexicon.txt', 'emoji_utf8_lexicon.txt'):
+        stat = os.stat(os.path.join(directory, name))
+        key.append((name, stat.st_size, stat.st_mtime_ns))
+    return tuple(key)
+
+
+def _read(path, key):
+    try:
+        # loads() on the whole file; marshal.load() reads a file in small pieces
+        with open(path, 'rb') as f:
+            version, snapshot_key, lexicon, emojis = marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if version != SNAPSHOT_VERSION or snapshot_key != key:
+        return None
+    return lexicon, emojis
+
+
+def write_snapshot(vader, path=DEFAULT_SNAPSHOT_PATH):
+    """Write vader's lexicon and emoji table to path atomically"""
+    from vaderSentiment import vaderSentiment
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        marshal.dump((SNAPSHOT_VERSION, _source_key(vaderSentiment), vader.lexicon, vader.emojis), f)
+    os.replace(temp_path, path)
+
+
+def load_vader(path=DEFAULT_SNAPSHOT_PATH):
+    """
+    Build a SentimentIntensityAnalyzer, from the snapshot when it is current.
+    A missing or stale snapshot is rebuilt from the text files (if the
+    location is writable). path=None always parses the text files.
+    Returns: (analyzer, whether the snapshot was used)
+    """
+    from vaderSentiment import vaderSentiment
+
+    if path is None:
+        return vaderSentiment.SentimentIntensityAnalyzer(), False
+
+    snapshot = _read(path, _source_key(vaderSentiment))
+    if snapshot is not None:
+        vader = vaderSentiment.SentimentIntensityAnalyzer.__new__(vaderSentiment.SentimentIntensityAnalyzer)
+        vader.lexicon, vader.emojis = snapshot
+        return vader, True
+
+    vader = vaderSentiment.SentimentIntensityAnalyzer()
+    try:
+        write_snapshot(vader, path)
+    except OSError:
+        pass
+    return vader, False
+
+
+if __name__ == '__main__':
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+    start = time.perf_counter()
+    analyzer = SentimentIntensityAnalyzer()
+    parse_ms = (time.perf_counter() - start) * 1000
+    write_snapshot(analyzer)
+
+    start = time.perf_counter()
+    load_vader()
+    load_ms = (time.perf_counter() - start) * 1000
+    print(f"Snapshot written to {DEFAULT_SNAPSHOT_PATH}")
+    print(f"Text lexicon parse: {parse_ms:.1f} ms, snapshot load: {load_ms:.1f} ms")
@@ -0,0 +1,301 @@
+"""
+Vectorized VADER Scoring
+Bulk VADER scoring with NumPy for offline re-scoring of large corpora.
+Tokens are mapped to integer ids once and VADER's lexicon, booster,
+negation, capitalization and normalization rules run as array operations
+over a padded (messages x tokens) matrix.
+"""
+import math
+
+import numpy as np
+
+from sentiment_backends import SentimentBackend
+from sentiment_snapshot import load_vader
+
+# Adjacent word pairs that start one of VADER's multi-word special cases or
+# booster phrases ("kind of", "yeah right", "kiss of death", ...); messages
+# containing one are scored by scalar VADER
+_RARE_BIGRAMS = (
+    ('the', 'shit'), ('the', 'bomb'), ('bad', 'ass'), ('bus', 'stop'), ('yeah', 'right'),
+    ('kiss', 'of'), ('of', 'death'), ('to', 'die'), ('die', 'for'), ('beating', 'heart'),
+    ('just', 'enough'), ('kind', 'of'), ('sort', 'of')
+)
+
+# Words the rules compare against directly
+_RULE_WORDS = ('no', 'or', 'nor', 'never', 'so', 'this', 'without', 'doubt',
+               'least', 'at', 'very', 'but')
+
+
+class VectorizedVaderBackend(SentimentBackend):
+    """
+    VADER scoring for large batches, with results identical to
+    vaderSentiment's polarity_scores.
+    Messages that need rules this engine doesn't vectorize (non-ASCII text,
+    where VADER rewrites emoji, and multi-word idioms such as "kind of")
+    are scored by scalar VADER instead; so is the order-dependent 'but'
+    rule, which is applied per message to the vectorized valences.
+    Messages are grouped by length into batches of batch_size rows to keep
+    padding small.
+    """
+    name = 'vader-numpy'
+
+    def __init__(self, vader=None, batch_size=2048, max_cached_words=200000):
+        from vaderSentiment import vaderSentiment
+
+        if vader is None:
+            vader, _ = load_vader()
+        self.vader = vader
+        self.batch_size = batch_size
+        self.max_cached_words = max_cached_words
+        self.vectorized = 0
+        self.fallbacks = 0
+        self._strip = vaderSentiment.SentiText._strip_punc_if_word
+        # Raw word -> encoded token (see _encode), so repeated words are
+        # only stripped and looked up once
+        self._word_cache = {}
+        self._but_check = vaderSentiment.SentimentIntensityAnalyzer._but_check
+        self._build_vocabulary(vaderSentiment)
+        # Emoji are only rewritten in non-ASCII text, which falls back anyway
+        self._ascii_safe = not any(emoji.isascii() for emoji in vader.emojis)
+
+    def _build_vocabulary(self, vaderSentiment):
+        lexicon = self.vader.lexicon
+        boosters = vaderSentiment.BOOSTER_DICT
+        words = ['', "n't"]  # padding, unknown words containing n't
+        words += sorted(set(lexicon) | set(boosters) | set(vaderSentiment.NEGATE) | set(_RULE_WORDS)
+                        | {word for bigram in _RARE_BIGRAMS for word in bigram})
+        self.vocabulary = {word: index for index, word in enumerate(words)}
+
+        self._valence = np.array([lexicon.get(word, 0.0) for word in words], dtype=np.float64)
+        self._in_lexicon = np.array([word in lexicon for word in words])
+        self._booster = np.array([boosters.get(word, 0.0) for word in words], dtype=np.float64)
+        self._is_booster = np.array([word in boosters for word in words])
+        self._negates = np.array([bool(word) and vaderSentiment.negated([word]) for word in words])
+        self._ids = {word: self.vocabulary[word] for word in _RULE_WORDS}
+        self._rare_bigrams = np.array(
+            [self.vocabulary[a] * len(words) + self.vocabulary[b] for a, b in _RARE_BIGRAMS], dtype=np.int64
+        )
+
+    def score(self, text):
+        return self.score_batch([text])[0]
+
+    def score_batch(self, texts):
+        scores = [None] * len(texts)
+        rows = []
+        for index, text in enumerate(texts):
+            if self._ascii_safe and text.isascii():
+                rows.append((index, self._tokenize(text)))
+            else:
+                scores[index] = self.vader.polarity_scores(text)
+                self.fallbacks += 1
+
+        rows.sort(key=lambda row: len(row[1][0]))
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start:start + self.batch_size]
+            for (index, _), result in zip(batch, self._score_rows([tokens for _, tokens in batch])):
+                scores[index] = result
+        for index, result in enumerate(scores):
+            if result is None:
+                scores[index] = self.vader.polarity_scores(texts[index])
+                self.fallbacks += 1
+        return scores
+
+    def _encode(self, word):
+        """Encode a raw word as token id * 2 + its ALL-CAPS flag"""
+        token = self._strip(word)
+        lowered = token.lower()
+        token_id = self.vocabulary.get(lowered)
+        if token_id is None:
+            token_id = 1 if "n't" in lowered else 0
+        code = token_id * 2 + token.isupper()
+        if len(self._word_cache) < self.max_cached_words:
+            self._word_cache[word] = code
+        return code
+
+    def _tokenize(self, text):
+        """Encoded tokens and punctuation counts for one message"""
+        cache = self._word_cache
+        codes = []
+        for word in text.split():
+            code = cache.get(word)
+            if code is None:
+                code = self._encode(word)
+            codes.append(code)
+        return codes, text.count('!'), text.count('?')
+
+    def _score_rows(self, rows):
+        """
+        Score tokenized messages; None for rows that need scalar VADER.
+        Every step keeps polarity_scores' order of floating-point operations
+        so results match it exactly.
+        """
+        count = len(rows)
+        width = max((len(codes) for codes, _, _ in rows), default=0)
+        results = [None] * count
+        if width == 0:
+            for row in range(count):
+                results[row] = {'neg': 0.0, 'neu': 0.0, 'pos': 0.0, 'compound': 0.0}
+                self.vectorized += 1
+            return results
+
+        codes = np.zeros((count, width), dtype=np.int64)
+        lengths = np.empty(count, dtype=np.int64)
+        for row, (row_codes, _, _) in enumerate(rows):
+            codes[row, :len(row_codes)] = row_codes
+            lengths[row] = len(row_codes)
+        ids = codes >> 1
+        upper = (codes & 1).astype(bool)
+
+        vocabulary_size = len(self.vocabulary)
+        bigrams = ids[:, :-1] * vocabulary_size + ids[:, 1:]
+        rare = np.isin(bigrams, self._rare_bigrams).any(axis=1)
+
+        positions = np.arange(width)
+        valid = positions < lengths[:, None]
+        caps = upper.sum(axis=1)
+        cap_diff = ((lengths - caps) > 0) & ((lengths - caps) < lengths)
+
+        def back(array, k, fill):
+            shifted = np.full_like(array, fill)
+            shifted[:, k:] = array[:, :-k]
+            return shifted
+
+        prev = [None] + [back(ids, k, 0) for k in (1, 2, 3)]
+        prev_upper = [None] + [back(upper, k, False) for k in (1, 2, 3)]
+        next_ids = np.zeros_like(ids)
+        next_ids[:, :-1] = ids[:, 1:]
+        word = self._ids
+
+        in_lexicon = self._in_lexicon[ids]
+        scored = in_lexicon & ~self._is_booster[ids] & valid
+        base = self._valence[ids]
+
+        # "no" before another lexicon word negates that word instead
+        valence = np.where((ids == word['no']) & self._in_lexicon[next_ids], 0.0, base)
+        after_no = ((prev[1] == word['no']) | (prev[2] == word['no'])
+                    | ((prev[3] == word['no']) & ((prev[1] == word['or']) | (prev[1] == word['nor']))))
+        valence = np.where(after_no, base * -0.74, valence)
+
+        # ALL-CAPS emphasis when only some words are capitalized
+        emphasis = upper & cap_diff[:, None]
+        valence = np.where(emphasis, np.where(valence > 0, valence + 0.733, valence - 0.733), valence)
+
+        so_or_this = [None] + [(prev[k] == word['so']) | (prev[k] == word['this']) for k in (1, 2, 3)]
+        for k in (1, 2, 3):
+            active = (positions >= k) & ~self._in_lexicon[prev[k]]
+
+            # Boosters/dampeners up to three words back, fading with distance
+            is_booster = self._is_booster[prev[k]]
+            scalar = self._booster[prev[k]]
+            scalar = np.where(valence < 0, scalar * -1, scalar)
+            booster_caps = is_booster & prev_upper[k] & cap_diff[:, None]
+            scalar = np.where(booster_caps, np.where(valence > 0, scalar + 0.733, scalar - 0.733), scalar)
+            scalar = np.where(is_booster, scalar, 0.0)
+            if k == 2:
+                scalar = np.where(scalar != 0, scalar * 0.95, scalar)
+            elif k == 3:
+                scalar = np.where(scalar != 0, scalar * 0.9, scalar)
+            valence = np.where(active, valence + scalar, valence)
+
+            negated = self._negates[prev[k]]
+            if k == 1:
+                valence = np.where(active & negated, valence * -0.74, valence)
+            else:
+                if k == 2:
+                    never_so = (prev[2] == word['never']) & so_or_this[1]
+                    without_doubt = (prev[2] == word['without']) & (prev[1] == word['doubt'])
+                else:
+                    never_so = ((prev[3] == word['never']) & so_or_this[2]) | so_or_this[1]
+                    without_doubt = (prev[3] == word['without']) & (
+                        (prev[2] == word['doubt']) | (prev[1] == word['doubt']))
+                valence = np.where(active & never_so, valence * 1.25, valence)
+                valence = np.where(active & ~never_so & ~without_doubt & negated, valence * -0.74, valence)
+
+        # "least" negates the next word, except in "at least"/"very least"
+        least = (prev[1] == word['least']) & ~self._in_lexicon[prev[1]]
+        least &= (positions == 1) | ((positions > 1) & (prev[2] != word['at']) & (prev[2] != word['very']))
+        valence = np.where(least, valence * -0.74, valence)
+
+        sentiments = np.where(scored, valence, 0.0)
+        has_but = (ids == word['but']).any(axis=1)
+
+        # Totals use the same summation as polarity_scores: Python's sum()
+        # (padding zeros don't change it) and running sums via cumsum
+        sums = [sum(row) for row in sentiments.tolist()]
+        positive_sums = np.cumsum(np.where(sentiments > 0, sentiments + 1, 0.0), axis=1)[:, -1]
+        negative_sums = np.cumsum(np.where(sentiments < 0, sentiments - 1, 0.0), axis=1)[:, -1]
+        neutral_counts = ((sentiments == 0) & valid).sum(axis=1)
+
+        for row, (row_codes, exclamations, questions) in enumerate(rows):
+            if rare[row]:
+                continue
+            length = lengths[row]
+            if length == 0:
+                results[row] = {'neg': 0.0, 'neu': 0.0, 'pos': 0.0, 'compound': 0.0}
+            elif has_but[row]:
+                # The 'but' rule depends on list order, so it runs in Python
+                words = ['but' if code >> 1 == word['but'] else '' for code in row_codes]
+                row_sentiments = self._but_check(words, sentiments[row, :length].tolist())
+                results[row] = _score_valence(row_sentiments, exclamations, questions)
+            else:
+                results[row] = _finish(float(sums[row]), float(positive_sums[row]),
+                                       float(negative_sums[row]), int(neutral_counts[row]),
+                                       exclamations, questions)
+            self.vectorized += 1
+        return results
+
+    def stats(self):
+        """Get how many messages were scored vectorized vs by scalar VADER"""
+        return {
+            'vectorized': self.vectorized,
+            'fallbacks': self.fallbacks,
+            'vocabulary_size': len(self.vocabulary)
+        }
+
+
+def _punctuation_emphasis(exclamations, questions):
+    ep_amplifier = min(exclamations, 4) * 0.292
+    qm_amplifier = 0
+    if questions > 1:
+        qm_amplifier = questions * 0.18 if questions <= 3 else 0.96
+    return ep_amplifier + qm_amplifier
+
+
+def _finish(sum_s, pos_sum, neg_sum, neu_count, exclamations, questions):
+    """VADER's score_valence from precomputed sums"""
+    punct_emph_amplifier = _punctuation_emphasis(exclamations, questions)
+    if sum_s > 0:
+        sum_s += punct_emph_amplifier
+    elif sum_s < 0:
+        sum_s -= punct_emph_amplifier
+
+    compound = sum_s / math.sqrt((sum_s * sum_s) + 15)
+    compound = max(-1.0, min(1.0, compound))
+
+    if pos_sum > math.fabs(neg_sum):
+        pos_sum += punct_emph_amplifier
+    elif pos_sum < math.fabs(neg_sum):
+        neg_sum -= punct_emph_amplifier
+
+    total = pos_sum + math.fabs(neg_sum) + neu_count
+    return {
+        'neg': round(math.fabs(neg_sum / total), 3),
+        'neu': round(math.fabs(neu_count / total), 3),
+        'pos': round(math.fabs(pos_sum / total), 3),
+        'compound': round(compound, 4)
+    }
+
+
+def _score_valence(sentiments, exclamations, questions):
+    """VADER's score_valence for a list of per-token sentiments"""
+    pos_sum = 0.0
+    neg_sum = 0.0
+    neu_count = 0
+    for sentiment in sentiments:
+        if sentiment > 0:
+            pos_sum += sentiment + 1
+        if sentiment < 0:
+            neg_sum += sentiment - 1
+        if sentiment == 0:
+            neu_count += 1
+    return _finish(float(sum(sentiments)), pos_sum, neg_sum, neu_count, exclamations, questions)
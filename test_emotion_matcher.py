@@ -0,0 +1,59 @@
+"""Tests for EmotionMatcher: 'substring' mode matches the original scan exactly"""
+import random
+
+from sentiment_analyzer import EMOTION_LEXICON, EmotionMatcher, SentimentAnalyzer
+
+
+def _original_detect(text_lower, lexicon=EMOTION_LEXICON):
+    """The scan EmotionMatcher replaced"""
+    return [emotion for emotion, keywords in lexicon.items() if any(word in text_lower for word in keywords)]
+
+
+def _fuzz_texts(lexicon, count, seed):
+    # Keywords glued to each other and to word fragments, so prefixes,
+    # overlaps and matches inside longer words all occur
+    rng = random.Random(seed)
+    pieces = [word for words in lexicon.values() for word in words]
+    pieces += ['what', 'ever', 'the', 'un', 'ed', 'ing', 's', 'my', 'money', 'I', 'am', '!', ',']
+    texts = []
+    for _ in range(count):
+        parts = [rng.choice(pieces) for _ in range(rng.randint(0, 12))]
+        texts.append(''.join(part + rng.choice(['', ' ', ' ', '-']) for part in parts).lower())
+    return texts
+
+
+def test_substring_mode_matches_original_scan():
+    matcher = EmotionMatcher(mode='substring')
+    for text in _fuzz_texts(EMOTION_LEXICON, 20000, seed=3):
+        assert matcher.match(text) == _original_detect(text), text
+
+
+def test_substring_mode_with_overlapping_custom_lexicon():
+    lexicon = {'a': ['stress', 'stressed out', 'ok'], 'b': ['stressed', 'oka'], 'c': ['out', 'k']}
+    matcher = EmotionMatcher(lexicon, mode='substring')
+    for text in _fuzz_texts(lexicon, 5000, seed=4):
+        assert matcher.match(text) == _original_detect(text, lexicon), text
+
+
+def test_word_mode_requires_word_start():
+    matcher = EmotionMatcher()
+    assert matcher.mode == 'word'
+    assert 'frustrated' not in matcher.match("whatever works for me")
+    assert 'frustrated' in matcher.match("i hate these fees")
+    assert 'frustrated' in EmotionMatcher(mode='substring').match("whatever works for me")
+    # Keywords still match as prefixes of longer words
+    assert 'stressed' in matcher.match("rent is so stressful")
+
+
+def test_analyzer_default_is_word_mode():
+    analyzer = SentimentAnalyzer(cache_size=0)
+    assert analyzer.analyze_sentiment("Whatever you think is fine", profile='fast')['emotions'] == []
+    compat = SentimentAnalyzer(cache_size=0, emotion_match='substring')
+    assert 'frustrated' in compat.analyze_sentiment("Whatever you think is fine", profile='fast')['emotions']
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
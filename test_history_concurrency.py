@@ -0,0 +1,170 @@
+"""Stress tests: history recorded from many threads loses nothing and stays consistent"""
+import os
+import tempfile
+import threading
+import time
+
+from sentiment_analyzer import SentimentAnalyzer
+from sentiment_benchmark import build_corpus
+from sentiment_columns import ColumnarSentimentStore
+from sentiment_history import SentimentTracker, ThreadBufferedHistory
+from sentiment_result import HistoryEntry
+
+THREADS = 16
+MESSAGES_PER_THREAD = 500
+
+
+def _run_threads(target, count):
+    start = threading.Barrier(count)
+    errors = []
+
+    def run(index):
+        start.wait()
+        try:
+            target(index)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors, errors[0]
+
+
+def test_analyzer_threads_with_concurrent_readers():
+    corpus = build_corpus('short')
+    analyzer = SentimentAnalyzer(history_limit=1000, columnar_history=True)
+    done = threading.Event()
+    reads = []
+
+    def read():
+        while not done.is_set():
+            summary = analyzer.get_sentiment_summary()
+            if isinstance(summary, dict):
+                assert summary['positive'] + summary['negative'] + summary['neutral'] == summary['total_messages']
+            analyzer.get_sentiment_timeseries('minute')
+            analyzer.get_sentiment_summary(window='messages')
+            reads.append(len(analyzer.sentiment_history))
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    try:
+        def write(index):
+            for i in range(MESSAGES_PER_THREAD):
+                text = corpus[(index * MESSAGES_PER_THREAD + i) % len(corpus)]
+                if i % 50 == 0:
+                    analyzer.analyze_batch([text, text], profile='fast')
+                else:
+                    analyzer.analyze_sentiment(text, profile='fast')
+
+        _run_threads(write, THREADS)
+    finally:
+        done.set()
+        reader.join()
+
+    total = THREADS * MESSAGES_PER_THREAD + THREADS * (MESSAGES_PER_THREAD // 50)
+    summary = analyzer.get_sentiment_summary()
+    assert summary['total_messages'] == total
+    assert summary['positive'] + summary['negative'] + summary['neutral'] == total
+    assert len(analyzer.sentiment_history) == 1000
+    assert len(analyzer.columns) == total
+    buckets = analyzer.get_sentiment_timeseries('hour')['buckets']
+    assert sum(bucket['count'] for bucket in buckets) == total
+    assert reads
+    # Every writer has finished, so their buffers are gone after the last merge
+    assert analyzer.history.stats() == {'thread_buffers': 0, 'pending': 0, 'merges': analyzer.history.merges}
+
+
+def test_short_lived_threads():
+    # Flask's threaded server runs each request on a new thread
+    history = ThreadBufferedHistory(SentimentTracker(), merge_threshold=64)
+    for _ in range(50):
+        _run_threads(lambda index: history.record(
+            HistoryEntry('hi', 'positive', 0.5, 0, (), time.time())), 20)
+    with history.reading() as tracker:
+        assert tracker.total == 1000
+    assert history.stats()['thread_buffers'] == 0
+
+
+def test_merged_in_time_order():
+    history = ThreadBufferedHistory(SentimentTracker(), merge_threshold=10 ** 9)
+
+    def write(index):
+        for i in range(200):
+            history.record(HistoryEntry('x', 'neutral', 0.0, 0, (), 1000.0 + i * THREADS + index))
+
+    _run_threads(write, THREADS)
+    with history.reading() as tracker:
+        timestamps = [entry.timestamp for entry in tracker.entries]
+    assert timestamps == sorted(timestamps)
+    assert len(timestamps) == 200 * THREADS
+
+
+def test_log_receives_entries_without_reads():
+    with tempfile.TemporaryDirectory() as directory:
+        analyzer = SentimentAnalyzer(history_log_dir=directory)
+        _run_threads(lambda index: [analyzer.analyze_sentiment(f"I am worried {index} {i}", profile='fast')
+                                    for i in range(5)], 4)
+        analyzer.analyze_batch(["thanks", "great"], profile='fast')
+        # Nothing has read or merged history; closing the log must still write everything
+        assert analyzer.history.merges == 0
+        analyzer.history_log.close()
+        lines = 0
+        for segment in analyzer.history_log.segments():
+            with open(os.path.join(directory, f"history-{segment:06d}.jsonl")) as f:
+                lines += sum(1 for _ in f)
+        assert lines == 22
+
+
+def test_columns_stay_in_time_order():
+    analyzer = SentimentAnalyzer(columnar_history=True)
+    corpus = build_corpus('medium')
+
+    def run(index):
+        if index == 0:
+            analyzer.analyze_batch(corpus, profile='fast')
+        else:
+            for text in corpus[:100]:
+                analyzer.analyze_sentiment(text, profile='fast')
+                analyzer.get_sentiment_summary()
+
+    _run_threads(run, 2)
+    analyzer.get_sentiment_summary()
+    timestamps = analyzer.columns.column('timestamp')
+    assert len(timestamps) == len(corpus) + 100
+    assert (timestamps[1:] >= timestamps[:-1]).all()
+    assert analyzer.get_columnar_summary(start=float(timestamps[0]))['total_messages'] == len(corpus) + 100
+    middle = float(timestamps[len(timestamps) // 2])
+    expected = int((timestamps >= middle).sum())
+    assert analyzer.get_columnar_summary(start=middle)['total_messages'] == expected
+    assert len(analyzer.get_columnar_texts(start=middle)) == expected
+
+
+def test_columnar_queries_include_unmerged_entries():
+    analyzer = SentimentAnalyzer(columnar_history=True)
+    _run_threads(lambda index: [analyzer.analyze_sentiment(f"I am worried {index} {i}", profile='fast')
+                                for i in range(5)], 4)
+    analyzer.analyze_batch(["thanks", "great"], profile='fast')
+    # Nothing has read history yet, so the store itself is still empty
+    assert analyzer.history.merges == 0 and len(analyzer.columns) == 0
+    assert analyzer.get_columnar_summary()['total_messages'] == 22
+    assert sorted(analyzer.get_columnar_texts()[-2:]) == ["great", "thanks"]
+    with tempfile.TemporaryDirectory() as directory:
+        analyzer.save_columnar_history(directory)
+        assert len(ColumnarSentimentStore.load(directory)) == 22
+    try:
+        SentimentAnalyzer().get_columnar_summary()
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("columnar_history is off")
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            start = time.perf_counter()
+            test()
+            print(f"✅ {name} ({time.perf_counter() - start:.1f}s)")
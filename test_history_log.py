@@ -0,0 +1,109 @@
+"""Tests for SentimentHistoryLog.read: offsets, segment skipping and partial lines"""
+import os
+import tempfile
+from datetime import datetime
+
+from sentiment_history import SentimentHistoryLog
+from sentiment_result import HistoryEntry
+
+START = datetime(2024, 5, 1, 9, 0).timestamp()
+
+
+def _entry(i):
+    return HistoryEntry(f"message {i}", 'neutral', 0.0, 0, (), START + i * 60)
+
+
+def _iso(i):
+    return datetime.fromtimestamp(START + i * 60).isoformat()
+
+
+def _write_log(directory, count, segment_max_entries=5):
+    log = SentimentHistoryLog(directory, segment_max_entries=segment_max_entries, flush_interval=3600)
+    for i in range(count):
+        log.append(_entry(i))
+    log.flush()
+    return log
+
+
+def _texts(items):
+    return [entry['text'] for entry, _ in items]
+
+
+def test_rotates_into_segments():
+    with tempfile.TemporaryDirectory() as directory:
+        log = _write_log(directory, 12)
+        assert log.segments() == [0, 1, 2]
+        assert _texts(log.read()) == [f"message {i}" for i in range(12)]
+        log.close()
+
+
+def test_resume_from_offset_across_segment_boundary():
+    with tempfile.TemporaryDirectory() as directory:
+        log = _write_log(directory, 12)
+        items = list(log.read())
+
+        # The offset after the last line of a segment points at its end
+        offset = items[4][1]
+        assert offset[0] == 0
+        assert _texts(log.read(offset=offset)) == [f"message {i}" for i in range(5, 12)]
+
+        offset = items[6][1]
+        assert offset[0] == 1
+        assert _texts(log.read(offset=offset)) == [f"message {i}" for i in range(7, 12)]
+
+        # Entries written after the last read are picked up from its offset
+        last = items[-1][1]
+        log.append(_entry(12))
+        log.flush()
+        assert _texts(log.read(offset=last)) == ["message 12"]
+        log.close()
+
+
+def test_time_range_spanning_rotated_segments():
+    with tempfile.TemporaryDirectory() as directory:
+        log = _write_log(directory, 20)
+        assert _texts(log.read(start=_iso(3), end=_iso(13))) == [f"message {i}" for i in range(3, 14)]
+        # datetimes work too, and a start in a later segment skips earlier ones
+        start = datetime.fromtimestamp(START + 11 * 60)
+        assert _texts(log.read(start=start)) == [f"message {i}" for i in range(11, 20)]
+        assert _texts(log.read(end=_iso(2))) == ["message 0", "message 1", "message 2"]
+        assert _texts(log.read(start=_iso(25))) == []
+        log.close()
+
+
+def test_truncated_last_line_is_not_read():
+    with tempfile.TemporaryDirectory() as directory:
+        log = _write_log(directory, 3)
+        path = os.path.join(directory, 'history-000000.jsonl')
+        line = '{"text": "message 3", "sentiment": "neutral", "compound": 0.0, "timestamp": "%s"}\n' % _iso(3)
+        with open(path, 'a') as f:
+            f.write(line[:25])
+
+        items = list(log.read())
+        assert _texts(items) == ["message 0", "message 1", "message 2"]
+
+        # Once the writer finishes the line, reading resumes at its start
+        with open(path, 'a') as f:
+            f.write(line[25:])
+        assert _texts(log.read(offset=items[-1][1])) == ["message 3"]
+        log.close()
+
+
+def test_time_range_tolerates_slightly_out_of_order_lines():
+    with tempfile.TemporaryDirectory() as directory:
+        log = SentimentHistoryLog(directory, segment_max_entries=3, flush_interval=3600)
+        # Entry 4 was stamped before entry 5 but queued after it
+        for i in (0, 1, 2, 3, 5, 4, 6, 7, 8):
+            log.append(_entry(i))
+        log.flush()
+        assert sorted(_texts(log.read(start=_iso(4), end=_iso(4)))) == ["message 4"]
+        assert sorted(_texts(log.read(start=_iso(3), end=_iso(4)))) == ["message 3", "message 4"]
+        assert sorted(_texts(log.read(start=_iso(5)))) == [f"message {i}" for i in range(5, 9)]
+        log.close()
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,98 @@
+"""Tests for reload_emotion_lexicon: every scoring path switches, bad files change nothing"""
+import json
+import os
+import tempfile
+
+from sentiment_analyzer import SentimentAnalyzer
+
+TEXT = "I feel bullish about my savings"
+OLD = {'stressed': ['worried', 'stress']}
+NEW = {'stressed': ['worried', 'stress'], 'optimistic': ['bullish']}
+
+
+def _write(path, lexicon):
+    with open(path, 'w') as f:
+        json.dump(lexicon, f)
+
+
+def test_reload_reaches_in_process_batch_and_pooled_paths():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'lexicon.json')
+        _write(path, OLD)
+        local = SentimentAnalyzer(emotion_lexicon_path=path)
+        pooled = SentimentAnalyzer(emotion_lexicon_path=path, process_workers=1)
+        try:
+            for analyzer in (local, pooled):
+                assert analyzer.analyze_sentiment(TEXT, profile='fast')['emotions'] == []
+
+            _write(path, NEW)
+            for analyzer in (local, pooled):
+                assert analyzer.reload_emotion_lexicon()['categories'] == 2
+                assert analyzer.analyze_sentiment(TEXT, profile='fast')['emotions'] == ['optimistic']
+                batch = analyzer.analyze_batch([TEXT, "thanks"], profile='fast')['results']
+                assert [result['emotions'] for result in batch] == [['optimistic'], []]
+
+            # Straight from the restarted workers, not the parent's matcher
+            assert pooled.pool.score_many([TEXT], 'fast')[0]['emotions'] == ['optimistic']
+            assert pooled.pool.fallbacks == 0
+        finally:
+            pooled.pool.close()
+
+
+def test_invalid_file_raises_and_keeps_old_matcher():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'lexicon.json')
+        _write(path, NEW)
+        analyzer = SentimentAnalyzer(emotion_lexicon_path=path)
+        matcher = analyzer.emotion_matcher
+
+        bad_files = {'broken.json': '{"optimistic": ["bullish"', 'shape.json': '{"optimistic": "bullish"}',
+                     'empty.json': '{}'}
+        for name, content in bad_files.items():
+            with open(os.path.join(directory, name), 'w') as f:
+                f.write(content)
+            try:
+                analyzer.reload_emotion_lexicon(os.path.join(directory, name))
+            except ValueError:
+                pass
+            else:
+                raise AssertionError(f"{name} should not load")
+        try:
+            analyzer.reload_emotion_lexicon(os.path.join(directory, 'missing.json'))
+        except OSError:
+            pass
+        else:
+            raise AssertionError("missing file should not load")
+
+        assert analyzer.emotion_matcher is matcher
+        assert analyzer.lexicon_reloads == 0
+        assert analyzer.lexicon_stats()['source'] == path
+        assert analyzer.analyze_sentiment(TEXT, profile='fast')['emotions'] == ['optimistic']
+
+
+def test_no_cached_result_from_old_lexicon():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'lexicon.json')
+        _write(path, OLD)
+        analyzer = SentimentAnalyzer(emotion_lexicon_path=path, cache_size=100)
+        for profile in ('full', 'fast'):
+            assert analyzer.analyze_sentiment(TEXT, profile=profile)['emotions'] == []
+        assert analyzer.analyze_batch([TEXT], profile='fast')['results'][0]['emotions'] == []
+        assert analyzer.cache.hits == 2
+
+        _write(path, NEW)
+        analyzer.reload_emotion_lexicon()
+        for profile in ('fast', 'full'):
+            assert analyzer.analyze_sentiment(TEXT, profile=profile)['emotions'] == ['optimistic']
+            assert analyzer.analyze_batch([TEXT], profile=profile)['results'][0]['emotions'] == ['optimistic']
+        # The text is cached again, now under the new lexicon
+        hits = analyzer.cache.hits
+        assert analyzer.analyze_sentiment(TEXT, profile='fast')['emotions'] == ['optimistic']
+        assert analyzer.cache.hits == hits + 1
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
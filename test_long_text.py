@@ -0,0 +1,81 @@
+"""Tests for long-message handling: sentence chunks, the character cap and truncation metadata"""
+import random
+
+from sentiment_analyzer import SentimentAnalyzer, _cap_text, split_chunks
+
+
+def _sentences_text(rng, words, max_word=10):
+    sentences = []
+    for _ in range(rng.randint(1, 30)):
+        sentence = ' '.join(''.join(rng.choice('abcdefghij') for _ in range(rng.randint(1, max_word)))
+                            for _ in range(rng.randint(1, words)))
+        sentences.append(sentence + rng.choice(['.', '!', '?', '', ',']))
+    return ' '.join(sentences)
+
+
+def test_split_chunks_respects_limit_and_keeps_every_word():
+    # Words (with punctuation) always fit in a chunk here
+    rng = random.Random(20)
+    for _ in range(2000):
+        max_chars = rng.choice([12, 20, 50, 120])
+        text = _sentences_text(rng, rng.choice([3, 10, 40]))
+        chunks = split_chunks(text, max_chars)
+        assert all(0 < len(chunk) <= max_chars for chunk in chunks), (text, max_chars)
+        assert ' '.join(chunks).split() == text.split(), (text, max_chars)
+
+
+def test_split_chunks_cuts_words_longer_than_the_limit():
+    chunks = split_chunks("Fine. " + "x" * 25 + " ok.", 10)
+    assert all(len(chunk) <= 10 for chunk in chunks)
+    assert chunks[0] == "Fine."
+    assert ''.join(chunks[1:-1]) + chunks[-1].split()[0] == "x" * 25
+    assert chunks[-1].endswith("ok.")
+
+
+def test_cap_text_cuts_at_a_word_boundary():
+    assert _cap_text("short text", 100) == "short text"
+    assert _cap_text("short text", None) == "short text"
+    assert _cap_text("hello world again", 11) == "hello world"
+    assert _cap_text("hello world again", 13) == "hello world"
+    assert _cap_text("hello world again", 14) == "hello world"
+    assert _cap_text("x" * 30, 10) == "x" * 10
+    rng = random.Random(21)
+    for _ in range(1000):
+        text = _sentences_text(rng, 10)
+        max_chars = rng.randint(1, 80)
+        capped = _cap_text(text, max_chars)
+        assert len(capped) <= max_chars and text.startswith(capped)
+        if len(text) > max_chars and ' ' in text[:max_chars].strip():
+            # Never ends inside a word
+            assert text[len(capped)] == ' ' or capped[-1] == ' '
+
+
+def test_truncated_results_carry_metadata():
+    analyzer = SentimentAnalyzer(long_text_chars=100, long_text_chunk_chars=50, max_scored_chars=200)
+    long = "I am worried about my debt. " * 40
+    medium = "I am worried about my debt. " * 5
+    for _ in range(2):  # the second round is served from the cache
+        result = analyzer.analyze_sentiment(long, profile='fast')
+        assert result.long_text['truncated'] is True
+        assert result.long_text['original_chars'] == len(long)
+        assert result.long_text['scored_chars'] <= 200
+        assert result.long_text['chunks'] >= 4
+
+        batch = analyzer.analyze_batch([long, medium, "thanks"], profile='fast')['results']
+        assert batch[0].long_text == result.long_text
+        assert batch[1].long_text['truncated'] is False and 'original_chars' not in batch[1].long_text
+        assert batch[2].long_text is None
+
+    # Capped below the chunking threshold: only the truncation is noted
+    capped = SentimentAnalyzer(cache_size=0, max_scored_chars=50).analyze_sentiment(long, profile='fast')
+    assert capped.long_text == {'truncated': True, 'original_chars': len(long)}
+    # The cached entry for the capped text is not marked for the short text itself
+    prefix = _cap_text(long, 200)
+    assert analyzer.analyze_sentiment(prefix, profile='fast').long_text['truncated'] is False
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,74 @@
+"""
+Parity tests: the analyzer's shared-token fast paths (VaderBackend.score_tokens
+and the derived TextBlob tokens) must match the libraries' public APIs exactly.
+These catch a vaderSentiment or textblob upgrade that changes the internals
+the fast paths rely on.
+"""
+import random
+
+from textblob import TextBlob
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+from sentiment_analyzer import SentimentAnalyzer, _tokenize
+from sentiment_backends import VaderBackend
+from sentiment_benchmark import SAMPLE_MESSAGES, build_corpus
+
+vader = SentimentIntensityAnalyzer()
+
+# Plain words, trailing punctuation, abbreviations, contractions, single
+# letters, boosters, negations, "but", caps, emoticons and non-ASCII text
+FUZZ_WORDS = (
+    "I i a A b x am so very not no never but BUT kind of worried WORRIED happy sad great "
+    "thanks. thanks! thanks? thanks, help. budget, debt! Mr. Dr. e.g. U.S. etc. vs. "
+    "can't won't isn't I'm it's don't \"quoted\" (paren) :) :( :D <3 ... !! ?? - -- "
+    "savings 401k $500 50% café naïve 😊 😟 extremely barely kinda sort-of ok OK"
+).split()
+
+
+def _texts():
+    rng = random.Random(2025)
+    texts = list(SAMPLE_MESSAGES)
+    for name in ('short', 'medium', 'long'):
+        texts.extend(build_corpus(name))
+    texts.extend(' '.join(rng.choice(FUZZ_WORDS) for _ in range(rng.randint(0, 20))) for _ in range(5000))
+    texts.extend(['', '   ', 'good  \t bad\n', 'Mr. Smith is great.', 'a b c', 'OK.'])
+    return texts
+
+
+def test_vader_score_tokens_matches_polarity_scores():
+    backend = VaderBackend(vader)
+    mismatches = []
+    for text in _texts():
+        got = backend.score_tokens(_tokenize(text))
+        want = vader.polarity_scores(text)
+        if got != want:
+            mismatches.append((text, got, want))
+    assert not mismatches, f"{len(mismatches)} mismatches, first: {mismatches[0]}"
+
+
+def test_textblob_fields_match_textblob_sentiment():
+    analyzer = SentimentAnalyzer(cache_size=0)
+    mismatches = []
+    for text in _texts():
+        result = analyzer._compute_scores(text, 'full')
+        want = TextBlob(text).sentiment
+        if (result.polarity, result.subjectivity) != (want.polarity, want.subjectivity):
+            mismatches.append((text, (result.polarity, result.subjectivity), tuple(want)))
+    assert not mismatches, f"{len(mismatches)} mismatches, first: {mismatches[0]}"
+
+
+def test_analyze_sentiment_matches_public_apis():
+    analyzer = SentimentAnalyzer()
+    for text in SAMPLE_MESSAGES:
+        result = analyzer.analyze_sentiment(text)
+        scores = vader.polarity_scores(text)
+        assert (result.compound, result.positive, result.negative, result.neutral) == \
+            (scores['compound'], scores['pos'], scores['neg'], scores['neu'])
+        assert (result.polarity, result.subjectivity) == tuple(TextBlob(text).sentiment)
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,28 @@
+"""Tests for batches that bypass the result cache (news scoring)"""
+from sentiment_analyzer import SentimentAnalyzer
+
+CHAT = ["I am worried about my rent", "thanks, that helps"]
+HEADLINES = [f"Markets rally as index {i} hits a record high" for i in range(20)]
+
+
+def test_uncached_batch_leaves_chat_cache_alone():
+    analyzer = SentimentAnalyzer(cache_size=len(CHAT))
+    analyzer.analyze_batch(CHAT, profile='fast')
+    before = analyzer.cache_stats()
+
+    news = analyzer.analyze_batch(HEADLINES, record_history=False, profile='fast', use_cache=False)['results']
+    assert analyzer.cache_stats() == before
+    assert [result.compound for result in news] == \
+        [result.compound for result in SentimentAnalyzer(cache_size=0).analyze_batch(HEADLINES, profile='fast')['results']]
+
+    # The chat messages are still cached
+    analyzer.analyze_batch(CHAT, profile='fast')
+    assert analyzer.cache_stats()['hits'] == before['hits'] + len(CHAT)
+    assert analyzer.cache_stats()['evictions'] == 0
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
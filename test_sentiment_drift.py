@@ -0,0 +1,66 @@
+"""Tests for SentimentDriftMonitor: one event per episode, re-armed after recovery"""
+import time
+
+from sentiment_drift import SentimentDriftMonitor
+from sentiment_result import HistoryEntry
+
+
+def _message(compound, emotions=()):
+    sentiment = 'positive' if compound >= 0.05 else 'negative' if compound <= -0.05 else 'neutral'
+    return HistoryEntry('message', sentiment, compound, (1 << len(emotions)) - 1, tuple(emotions), time.time())
+
+
+def _observe(monitor, user_id, compounds, emotions=()):
+    return [event for event in (monitor.observe(user_id, _message(compound, emotions)) for compound in compounds)
+            if event is not None]
+
+
+def test_mood_drop_fires_once_per_episode_and_rearms():
+    seen = []
+    monitor = SentimentDriftMonitor(on_drift=seen.append)
+
+    assert _observe(monitor, 'u1', [0.6] * 5) == []
+    events = _observe(monitor, 'u1', [-0.8] * 10)
+    assert len(events) == 1
+    assert events[0]['user_id'] == 'u1' and events[0]['reasons'] == ['mood_drop']
+    assert monitor.state('u1')['alerting'] is True
+
+    # Recovering above the mood floor re-arms without firing
+    assert _observe(monitor, 'u1', [0.6]) == []
+    assert monitor.state('u1')['alerting'] is False
+    assert _observe(monitor, 'u1', [0.6] * 5) == []
+
+    events = _observe(monitor, 'u1', [-0.8] * 10)
+    assert len(events) == 1
+
+    # Every event went to both the callback and the queue, once
+    assert len(seen) == 2
+    assert monitor.drain() == seen
+    assert monitor.stats()['emitted'] == 2
+
+
+def test_distress_fires_once_and_rearms_when_rate_falls():
+    monitor = SentimentDriftMonitor()
+    events = _observe(monitor, 'u2', [0.0] * 8, emotions=('stressed',))
+    assert len(events) == 1 and events[0]['reasons'] == ['distress']
+    # Fired on the first message past min_messages
+    assert events[0]['messages'] == monitor.min_messages
+
+    assert _observe(monitor, 'u2', [0.0]) == []
+    assert monitor.state('u2')['alerting'] is False
+    assert len(_observe(monitor, 'u2', [0.0] * 5, emotions=('frustrated',))) == 1
+
+
+def test_no_event_before_min_messages_or_for_other_users():
+    monitor = SentimentDriftMonitor(distress_threshold=0.9)
+    assert _observe(monitor, 'new', [-0.9, -0.9], emotions=('stressed',)) == []
+    assert _observe(monitor, 'calm', [0.3] * 20) == []
+    assert monitor.stats()['emitted'] == 0
+    assert monitor.state('unknown') is None
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,38 @@
+"""Tests for SentimentWorkerPool: crash recovery keeps results in order"""
+import os
+import signal
+import time
+
+from sentiment_analyzer import SentimentAnalyzer
+from sentiment_benchmark import build_corpus
+
+
+def test_killed_worker_is_replaced_and_results_stay_in_order():
+    texts = build_corpus('short')[:200]
+    expected = [result.compound for result in SentimentAnalyzer(cache_size=0).analyze_batch(texts, profile='fast')['results']]
+
+    analyzer = SentimentAnalyzer(cache_size=0, process_workers=2)
+    try:
+        assert analyzer.pool.stats()['start_method'] == 'fork'
+        os.kill(analyzer.pool.pids[0], signal.SIGKILL)
+        time.sleep(0.2)
+
+        results = analyzer.analyze_batch(texts, profile='fast')['results']
+        assert [result.compound for result in results] == expected
+        assert analyzer.pool.restarts == 1
+
+        # The replacement workers are not forked from the threaded server
+        assert analyzer.pool.stats()['start_method'] in ('forkserver', 'spawn')
+        results = analyzer.analyze_batch(texts[::-1], profile='fast')['results']
+        assert [result.compound for result in results] == expected[::-1]
+        assert analyzer.pool.restarts == 1
+    finally:
+        analyzer.pool.close()
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            start = time.perf_counter()
+            test()
+            print(f"✅ {name} ({time.perf_counter() - start:.1f}s)")
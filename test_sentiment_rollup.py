@@ -0,0 +1,54 @@
+"""Tests for SentimentRollup bucket labels outside UTC"""
+import os
+import time
+from datetime import datetime, timezone
+
+from sentiment_history import SentimentRollup
+
+
+def _in_timezone(name, run):
+    previous = os.environ.get('TZ')
+    os.environ['TZ'] = name
+    time.tzset()
+    try:
+        return run()
+    finally:
+        if previous is None:
+            del os.environ['TZ']
+        else:
+            os.environ['TZ'] = previous
+        time.tzset()
+
+
+def test_hourly_bucket_starts_on_the_hour_in_half_hour_zone():
+    def run():
+        rollup = SentimentRollup(3600, 24)
+        # 10:15 and 10:50 IST are 04:45 and 05:20 UTC: two UTC hours
+        for hour, minute, compound in ((10, 15, 0.5), (10, 50, -0.5)):
+            epoch = datetime(2024, 5, 1, hour, minute).timestamp()
+            rollup.add(epoch, compound, 'positive' if compound > 0 else 'negative')
+        return rollup.series()
+
+    series = _in_timezone('Asia/Kolkata', run)
+    assert [bucket['start'] for bucket in series] == ['2024-05-01T04:00:00+00:00', '2024-05-01T05:00:00+00:00']
+    for bucket in series:
+        start = datetime.fromisoformat(bucket['start'])
+        assert start.utcoffset() is not None and start.minute == 0
+        assert start.timestamp() % 3600 == 0
+
+
+def test_bucket_range_accepts_labels_back():
+    rollup = SentimentRollup(60, 100)
+    base = datetime(2024, 5, 1, 9, 0, tzinfo=timezone.utc).timestamp()
+    for i in range(5):
+        rollup.add(base + i * 60 + 30, 0.1, 'positive')
+    starts = [bucket['start'] for bucket in rollup.series()]
+    middle = datetime.fromisoformat(starts[2]).timestamp()
+    assert [bucket['start'] for bucket in rollup.series(start=middle)] == starts[2:]
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,109 @@
+"""Tests for the transformer backend (offline tiny checkpoint) and DynamicBatcher"""
+import tempfile
+import threading
+import unittest
+from importlib.util import find_spec
+
+from sentiment_backends import DynamicBatcher, TransformerBackend, build_test_checkpoint
+
+HAS_TORCH = find_spec('torch') is not None and find_spec('transformers') is not None
+
+
+class _StubScorer:
+    """score_batch stand-in that records batch sizes and fails on 'boom'"""
+    def __init__(self):
+        self.batch_sizes = []
+        self.lock = threading.Lock()
+
+    def __call__(self, texts):
+        with self.lock:
+            self.batch_sizes.append(len(texts))
+        if 'boom' in texts:
+            raise RuntimeError('boom')
+        return [{'compound': float(len(text)), 'text': text} for text in texts]
+
+
+def _submit_concurrently(batcher, texts):
+    start = threading.Barrier(len(texts))
+    futures = [None] * len(texts)
+
+    def submit(index):
+        start.wait()
+        futures[index] = batcher.submit(texts[index])
+
+    threads = [threading.Thread(target=submit, args=(index,)) for index in range(len(texts))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return futures
+
+
+def test_batcher_returns_each_caller_its_own_score():
+    scorer = _StubScorer()
+    batcher = DynamicBatcher(scorer, max_batch_size=8, max_wait_ms=50)
+    try:
+        texts = [f"message {i}" for i in range(64)]
+        futures = _submit_concurrently(batcher, texts)
+        for text, future in zip(texts, futures):
+            assert future.result(timeout=5)['text'] == text
+    finally:
+        batcher.close()
+
+    assert max(scorer.batch_sizes) <= 8
+    assert sum(scorer.batch_sizes) == 64
+    # Concurrent submits were grouped rather than scored one at a time
+    assert len(scorer.batch_sizes) < 64
+    assert batcher.stats()['items'] == 64
+
+
+def test_batcher_propagates_exceptions():
+    scorer = _StubScorer()
+    batcher = DynamicBatcher(scorer, max_batch_size=4, max_wait_ms=20)
+    try:
+        failed = batcher.submit('boom')
+        try:
+            failed.result(timeout=5)
+        except RuntimeError as e:
+            assert str(e) == 'boom'
+        else:
+            raise AssertionError("expected the scorer's exception")
+        # The worker keeps running after a failed batch
+        assert batcher.submit('fine').result(timeout=5)['text'] == 'fine'
+    finally:
+        batcher.close()
+
+
+def test_transformer_backend_tiny_checkpoint():
+    if not HAS_TORCH:
+        raise unittest.SkipTest('torch/transformers not installed')
+
+    with tempfile.TemporaryDirectory() as directory:
+        backend = TransformerBackend(build_test_checkpoint(directory), max_batch_size=4, max_wait_ms=5)
+        try:
+            texts = ["I am so worried about my debt", "thank you", "great", "help me save money",
+                     "invest", "budget"]
+            batch = backend.score_batch(texts)
+            assert len(batch) == len(texts)
+            for scores in batch:
+                assert set(scores) == {'compound', 'pos', 'neg', 'neu'}
+                assert -1.0 <= scores['compound'] <= 1.0
+                assert abs(scores['pos'] + scores['neg'] + scores['neu'] - 1.0) < 0.01
+            # Single calls go through the batcher; padding in the other batch
+            # can move the rounded scores by a hair
+            for text, scores in zip(texts, batch):
+                single = backend.score(text)
+                assert all(abs(single[key] - scores[key]) <= 0.002 for key in scores)
+        finally:
+            backend.close()
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            try:
+                test()
+            except unittest.SkipTest as e:
+                print(f"⏭️  {name} (skipped: {e})")
+                continue
+            print(f"✅ {name}")
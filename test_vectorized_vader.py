@@ -0,0 +1,63 @@
+"""Parity tests: VectorizedVaderBackend must match vaderSentiment exactly"""
+import random
+
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+from sentiment_benchmark import SAMPLE_MESSAGES, build_corpus
+from sentiment_vectorized import VectorizedVaderBackend
+
+vader = SentimentIntensityAnalyzer()
+
+# Words that exercise every rule: negation, "no", boosters and dampeners,
+# ALL CAPS, "never so", "without doubt", "least", "but", idioms, punctuation,
+# emoticons and non-ASCII fallbacks
+RULE_WORDS = (
+    "no not never so this without doubt least at very but BUT kind of sort just enough "
+    "the bomb yeah right good GOOD bad BAD great GREAT happy sad love hate extremely "
+    "EXTREMELY barely kinda isn't didn't shouldn't've nor or a I am it is was ! !! ? ?? ??? "
+    ", . :) :( :D <3 help worried thanks lol LOL fine okay nope uhuh rarely despite 😊 café"
+).split()
+
+
+def _assert_parity(backend, texts):
+    expected = [vader.polarity_scores(text) for text in texts]
+    scored = backend.score_batch(texts)
+    mismatches = [(text, got, want) for text, got, want in zip(texts, scored, expected) if got != want]
+    assert not mismatches, f"{len(mismatches)} mismatches, first: {mismatches[0]}"
+
+
+def test_sample_messages():
+    _assert_parity(VectorizedVaderBackend(vader), SAMPLE_MESSAGES)
+
+
+def test_benchmark_corpora():
+    backend = VectorizedVaderBackend(vader)
+    for name in ('short', 'medium', 'long'):
+        _assert_parity(backend, build_corpus(name))
+    # Plain chat text should not need the scalar fallback
+    assert backend.stats()['fallbacks'] == 0
+
+
+def test_rule_fuzz():
+    rng = random.Random(2024)
+    texts = [' '.join(rng.choice(RULE_WORDS) for _ in range(rng.randint(0, 25))) for _ in range(20000)]
+    _assert_parity(VectorizedVaderBackend(vader, batch_size=512), texts)
+
+
+def test_edge_cases():
+    texts = ['', '   ', '!!!', '???', 'GOOD', 'good', 'GOOD bad', 'no good', 'no no no',
+             'not bad at all', 'at least good', 'very least good', 'least good',
+             'good but bad', 'but', 'bad but good but great', 'kind of good', 'I LOVE it!!!!!']
+    _assert_parity(VectorizedVaderBackend(vader), texts)
+
+
+def test_single_score():
+    backend = VectorizedVaderBackend(vader)
+    assert backend.score("I'm so worried about my debt") == vader.polarity_scores("I'm so worried about my debt")
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"✅ {name}")